@@ -0,0 +1,431 @@
+#!/usr/bin/env python
+"""
+Benchmarks the rich-text pipeline (extract_attrs, expand_db_html,
+FlexibleDbWhitelister.clean and the flexiblerichtext filter) against
+synthetic documents stored in an in-memory SQLite database.
+
+Usage:
+
+    python benchmarks/rich_text.py --size 100 --link-density 4 \\
+        --output results.json --compare previous.json
+
+Each stage reports operations per second, queries per operation and peak
+memory (Python 3 only). Results are written as JSON so that runs from
+different commits can be compared with --compare.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod '
+    'tempor incididunt ut labore et dolore magna aliqua'
+).split()
+
+
+def configure(media_root):
+    """
+    Configures Django with an in-memory database and creates the schema.
+
+    :param media_root: directory for uploaded files.
+    """
+    sys.path.insert(0, ROOT)
+
+    from django.conf import settings
+
+    settings.configure(
+        DEBUG               = False,
+        DATABASES           = {
+            'default': {
+                'ENGINE':   'django.db.backends.sqlite3',
+                'NAME':     ':memory:',
+            },
+        },
+        CACHES              = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+        },
+        INSTALLED_APPS      = [
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'taggit',
+            'modelcluster',
+            'wagtailplus',
+            'wagtail.wagtailcore',
+            'wagtail.wagtailadmin',
+            'wagtail.wagtaildocs',
+            'wagtail.wagtailembeds',
+            'wagtail.wagtailimages',
+            'wagtail.wagtailsearch',
+            'wagtail.wagtailusers',
+            'wagtailplus.wagtaillinks',
+        ],
+        # The bundled link migrations are placeholders; create the
+        # tables directly instead.
+        MIGRATION_MODULES   = {'wagtaillinks': 'wagtaillinks.nomigrations'},
+        MEDIA_ROOT          = media_root,
+        RICH_TEXT_CACHE     = 'default',
+        ROOT_URLCONF        = 'wagtail.wagtailcore.urls',
+        WAGTAIL_SITE_NAME   = 'Benchmarks',
+    )
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', interactive=False, verbosity=0)
+
+def create_targets(count):
+    """
+    Creates link targets and returns their IDs keyed by link type.
+
+    :param count: number of instances per link type.
+    :rtype: dict.
+    """
+    from django.core.files.base import ContentFile
+    from wagtail.wagtailcore.models import Page
+    from wagtail.wagtaildocs.models import Document
+    from wagtail.wagtailimages.models import Image
+    from wagtailplus.wagtaillinks.models import Link
+
+    root    = Page.objects.get(depth=1)
+    targets = {'page': [], 'document': [], 'link': [], 'image': []}
+
+    for i in range(count):
+        page = root.add_child(instance=Page(
+            title   = 'Page {0}'.format(i),
+            slug    = 'page-{0}'.format(i)
+        ))
+        targets['page'].append(page.pk)
+
+        document = Document(title='Document {0}'.format(i))
+        document.file.save('document-{0}.txt'.format(i), ContentFile(b'x'))
+        targets['document'].append(document.pk)
+
+        link = Link.objects.create(
+            title           = 'Link {0}'.format(i),
+            external_url    = 'http://example.com/{0}/'.format(i)
+        )
+        targets['link'].append(link.pk)
+
+    try:
+        from io import BytesIO
+        from PIL import Image as PILImage
+
+        for i in range(min(count, 5)):
+            data = BytesIO()
+            PILImage.new('RGB', (64, 64)).save(data, 'PNG')
+
+            image = Image(title='Image {0}'.format(i))
+            image.file.save('image-{0}.png'.format(i), ContentFile(data.getvalue()))
+            targets['image'].append(image.pk)
+    except ImportError:
+        pass
+
+    return targets
+
+def build_document(size, link_density, embed_density, targets, seed=0):
+    """
+    Returns synthetic database-representation HTML.
+
+    :param size: approximate document size in bytes.
+    :param link_density: rich-text links per KB.
+    :param embed_density: image embeds per KB.
+    :param targets: dictionary of target IDs keyed by link type.
+    :param seed: random seed.
+    :rtype: str.
+    """
+    rnd         = random.Random(seed)
+    link_types  = [t for t in ('page', 'document', 'link') if targets[t]]
+    paragraphs  = []
+    length      = 0
+    links       = 0.0
+    embeds      = 0.0
+
+    while length < size:
+        words = [rnd.choice(WORDS) for _ in range(60)]
+
+        links += link_density / 2.0
+        while links >= 1 and link_types:
+            link_type   = rnd.choice(link_types)
+            index       = rnd.randrange(len(words))
+            words[index] = '<a linktype="{0}" id="{1}">{2}</a>'.format(
+                link_type,
+                rnd.choice(targets[link_type]),
+                words[index]
+            )
+            links -= 1
+
+        # Plain anchors are common in pasted content.
+        index = rnd.randrange(len(words))
+        words[index] = '<a href="http://example.com/">{0}</a>'.format(words[index])
+
+        embeds += embed_density / 2.0
+        while embeds >= 1 and targets['image']:
+            words.append('<embed alt="x" embedtype="image" format="left" id="{0}"/>'.format(
+                rnd.choice(targets['image'])
+            ))
+            embeds -= 1
+
+        paragraph = '<p>{0}</p>'.format(' '.join(words))
+        paragraphs.append(paragraph)
+        length += len(paragraph)
+
+    return '\n'.join(paragraphs)
+
+def measure(fn, iterations):
+    """
+    Returns timing, query and memory statistics for specified callable.
+
+    :param fn: the callable to measure.
+    :param iterations: number of calls to time.
+    :rtype: dict.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    # Warm up and count queries for a single call.
+    with CaptureQueriesContext(connection) as context:
+        fn()
+    queries = len(context.captured_queries)
+
+    peak = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+
+    elapsed = timeit.timeit(fn, number=iterations)
+
+    return {
+        'ops_per_sec':      round(iterations / elapsed, 2),
+        'queries':          queries,
+        'peak_memory_kb':   peak,
+    }
+
+def legacy_expand_db_html(html, for_editor=False):
+    """
+    Reference implementation using one regex pass per tag kind and
+    attribute parsing for every anchor, as before the single-pass scanner.
+
+    :param html: the HTML to parse.
+    :param for_editor: flag to display in editor or frontend.
+    :rtype: str.
+    """
+    from wagtail.wagtailcore.rich_text import EMBED_HANDLERS
+    from wagtailplus import rich_text
+
+    instances = rich_text.get_link_instances(rich_text.get_link_ids(html))
+
+    def replace_a_tag(m):
+        attrs = rich_text.extract_attrs(m.group(1))
+        if 'linktype' not in attrs:
+            return m.group(0)
+        handler = rich_text.LINK_HANDLERS[attrs['linktype']]
+        return handler.expand_db_attributes(
+            attrs,
+            for_editor,
+            instances[attrs['linktype']]
+        )
+
+    def replace_embed_tag(m):
+        attrs = rich_text.extract_attrs(m.group(1))
+        handler = EMBED_HANDLERS[attrs['embedtype']]
+        return handler.expand_db_attributes(attrs, for_editor)
+
+    html = rich_text.FIND_A_TAG.sub(replace_a_tag, html)
+    html = rich_text.FIND_EMBED_TAG.sub(replace_embed_tag, html)
+
+    return html
+
+def run_stages(html, iterations, stages):
+    """
+    Returns results for each requested pipeline stage.
+
+    :param html: the database-representation HTML.
+    :param iterations: number of calls to time per stage.
+    :param stages: list of stage names.
+    :rtype: dict.
+    """
+    from django.core.cache import caches
+    from wagtailplus import rich_text
+    from wagtailplus.templatetags.wagtailplus_tags import flexiblerichtext
+
+    editor_html = rich_text.expand_db_html(html, for_editor=True)
+    attr_strings = rich_text.FIND_A_TAG.findall(html)
+
+    def extract_attrs():
+        for attr_string in attr_strings:
+            rich_text.extract_attrs(attr_string)
+
+    def filter_cold():
+        caches['default'].clear()
+        flexiblerichtext(html)
+
+    available = {
+        'extract_attrs':        extract_attrs,
+        'expand_db_html':       lambda: rich_text.expand_db_html(html),
+        'expand_db_html_legacy': lambda: legacy_expand_db_html(html),
+        'expand_db_html_editor': lambda: rich_text.expand_db_html(html, for_editor=True),
+        'whitelister_clean':    lambda: rich_text.FlexibleDbWhitelister.clean(editor_html),
+        'filter_cold':          filter_cold,
+        'filter_warm':          lambda: flexiblerichtext(html),
+    }
+
+    results = {}
+    for name in stages:
+        results[name] = measure(available[name], iterations)
+        print('{0:<24} {1[ops_per_sec]:>10} ops/s {1[queries]:>5} queries {1[peak_memory_kb]} KB'.format(
+            name,
+            results[name]
+        ))
+
+    return results
+
+def run_scaling(targets, link_density, embed_density, sizes):
+    """
+    Compares the single-pass scanner with the legacy two-pass
+    implementation across document sizes.
+
+    :param targets: dictionary of target IDs keyed by link type.
+    :param link_density: rich-text links per KB.
+    :param embed_density: image embeds per KB.
+    :param sizes: list of document sizes in KB.
+    :rtype: dict.
+    """
+    from wagtailplus import rich_text
+
+    results = {}
+
+    for size in sizes:
+        html        = build_document(size * 1024, link_density, embed_density, targets)
+        iterations  = max(1, 2000 // size)
+        current     = timeit.timeit(lambda: rich_text.expand_db_html(html), number=iterations)
+        legacy      = timeit.timeit(lambda: legacy_expand_db_html(html), number=iterations)
+
+        results[str(size)] = {
+            'single_pass_ms':   round(current * 1000 / iterations, 3),
+            'legacy_ms':        round(legacy * 1000 / iterations, 3),
+            'speedup':          round(legacy / current, 2),
+        }
+        print('{0:>6} KB {1[single_pass_ms]:>10} ms {1[legacy_ms]:>10} ms legacy  x{1[speedup]}'.format(
+            size,
+            results[str(size)]
+        ))
+
+    return results
+
+def get_commit():
+    """
+    Returns current git commit, if available.
+
+    :rtype: str.
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, previous):
+    """
+    Prints relative change of each stage against previous results.
+
+    :param results: the current results dictionary.
+    :param previous: the previous results dictionary.
+    """
+    print('\nCompared with {0}:'.format(previous.get('commit')))
+
+    for name, stats in sorted(results['stages'].items()):
+        before = previous.get('stages', {}).get(name)
+        if not before:
+            continue
+
+        change = (stats['ops_per_sec'] / before['ops_per_sec'] - 1) * 100
+        print('{0:<24} {1:>+8.1f}% ops/s, queries {2} -> {3}'.format(
+            name,
+            change,
+            before['queries'],
+            stats['queries']
+        ))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--size', type=int, default=50, help='Document size in KB.')
+    parser.add_argument('--link-density', type=float, default=2.0, help='Rich-text links per KB.')
+    parser.add_argument('--embed-density', type=float, default=0.2, help='Image embeds per KB.')
+    parser.add_argument('--targets', type=int, default=50, help='Link targets per link type.')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed calls per stage.')
+    parser.add_argument('--stages', nargs='+', default=[
+        'extract_attrs',
+        'expand_db_html',
+        'expand_db_html_legacy',
+        'expand_db_html_editor',
+        'whitelister_clean',
+        'filter_cold',
+        'filter_warm',
+    ])
+    parser.add_argument('--scaling', nargs='*', type=int, default=[10, 100, 1000, 5000], help='Document sizes in KB for the scanner comparison.')
+    parser.add_argument('--output', help='Write results as JSON to this file.')
+    parser.add_argument('--compare', help='Compare with results from this JSON file.')
+    args = parser.parse_args()
+
+    media_root = tempfile.mkdtemp()
+
+    try:
+        configure(media_root)
+
+        targets = create_targets(args.targets)
+        html    = build_document(
+            args.size * 1024,
+            args.link_density,
+            args.embed_density,
+            targets
+        )
+
+        results = {
+            'commit':   get_commit(),
+            'params':   vars(args),
+            'stages':   run_stages(html, args.iterations, args.stages),
+        }
+
+        if args.scaling:
+            print()
+            results['scaling'] = run_scaling(
+                targets,
+                args.link_density,
+                args.embed_density,
+                args.scaling
+            )
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Runs the wagtailplus test suite with minimal settings:
+
+    python runtests.py [test labels]
+"""
+import sys
+
+import django
+from django.conf import settings
+from django.test.utils import get_runner
+
+
+def configure():
+    """
+    Configures minimal settings for the test suite.
+    """
+    settings.configure(
+        DEBUG               = False,
+        SECRET_KEY          = 'wagtailplus-tests',
+        DATABASES           = {
+            'default': {
+                'ENGINE':   'django.db.backends.sqlite3',
+                'NAME':     ':memory:',
+            },
+        },
+        CACHES              = {
+            'default': {
+                'BACKEND':  'django.core.cache.backends.locmem.LocMemCache',
+            },
+        },
+        INSTALLED_APPS      = (
+            'wagtailplus',
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'django.contrib.sessions',
+            'django.contrib.messages',
+            'django.contrib.staticfiles',
+            'compressor',
+            'taggit',
+            'modelcluster',
+            'schedule',
+            'wagtail.wagtailcore',
+            'wagtail.wagtailadmin',
+            'wagtail.wagtaildocs',
+            'wagtail.wagtailsnippets',
+            'wagtail.wagtailusers',
+            'wagtail.wagtailimages',
+            'wagtail.wagtailembeds',
+            'wagtail.wagtailsearch',
+            'wagtailplus.wagtailaddresses',
+            'wagtailplus.wagtailcontacts',
+            'wagtailplus.wagtailevents',
+            'wagtailplus.wagtaillinks',
+        ),
+        MIDDLEWARE_CLASSES  = (
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+        ),
+        TEMPLATES           = [{
+            'BACKEND':  'django.template.backends.django.DjangoTemplates',
+            'APP_DIRS': True,
+            'OPTIONS':  {
+                'context_processors': [
+                    'django.contrib.auth.context_processors.auth',
+                    'django.template.context_processors.request',
+                    'django.contrib.messages.context_processors.messages',
+                ],
+            },
+        }],
+        STATIC_URL          = '/static/',
+        STATICFILES_FINDERS = (
+            'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+            'compressor.finders.CompressorFinder',
+        ),
+        PASSWORD_HASHERS    = ('django.contrib.auth.hashers.MD5PasswordHasher',),
+        USE_TZ              = True,
+        WAGTAIL_SITE_NAME   = 'wagtailplus',
+    )
+
+def runtests(labels):
+    """
+    Runs specified tests, or the whole suite, and exits with status 1 if
+    any test fails.
+
+    :param labels: list of test labels.
+    """
+    configure()
+    django.setup()
+
+    runner      = get_runner(settings)(verbosity=1, interactive=False)
+    failures    = runner.run_tests(labels or ['wagtailplus'])
+
+    sys.exit(bool(failures))
+
+if __name__ == '__main__':
+    runtests(sys.argv[1:])
@@ -0,0 +1,54 @@
+"""
+Contains app-specific settings.
+"""
+from django.conf import settings
+
+
+# Cache alias used for rendered rich-text (None disables caching).
+RICH_TEXT_CACHE         = getattr(settings, 'RICH_TEXT_CACHE', None)
+RICH_TEXT_CACHE_TIMEOUT = getattr(settings, 'RICH_TEXT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# Cache alias and timeout used to skip re-cleaning unchanged rich-text
+# (None disables it). Entries hold the full editor HTML, so use a cache
+# sized for it.
+RICH_TEXT_CLEAN_CACHE           = getattr(settings, 'RICH_TEXT_CLEAN_CACHE', None)
+RICH_TEXT_CLEAN_CACHE_TIMEOUT   = getattr(settings, 'RICH_TEXT_CLEAN_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# Cache alias and timeout used for page URLs in rich-text links (None
+# disables it). Use a cache shared by all processes, such as memcached.
+PAGE_URL_CACHE          = getattr(settings, 'PAGE_URL_CACHE', None)
+PAGE_URL_CACHE_TIMEOUT  = getattr(settings, 'PAGE_URL_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# Read related items from the materialized RelatedItem table instead of
+# computing them on each request.
+RELATED_ITEMS_MATERIALIZED = getattr(settings, 'RELATED_ITEMS_MATERIALIZED', False)
+
+# Related fields selected when loading generic items in bulk, keyed by
+# "app_label.model_name"; extends the defaults below.
+GENERIC_SELECT_RELATED = {
+    'wagtailaddresses.address': (
+        'route',
+        'locality',
+        'administrative_area_level_2',
+        'administrative_area_level_1',
+        'postal_code',
+        'country',
+    ),
+    'wagtailcontacts.contact': ('address', 'image'),
+}
+GENERIC_SELECT_RELATED.update(getattr(settings, 'GENERIC_SELECT_RELATED', {}))
+
+# Count strategies ("exact", "counter" or "estimate") keyed by
+# "app_label.model_name"; see wagtailplus.counters.
+COUNT_STRATEGIES            = getattr(settings, 'COUNT_STRATEGIES', {})
+COUNT_ESTIMATE_THRESHOLD    = getattr(settings, 'COUNT_ESTIMATE_THRESHOLD', 10000)
+
+# Read popular tags from the TagCount table, maintained by signals and
+# the recount_tags command.
+POPULAR_TAGS_MATERIALIZED = getattr(settings, 'POPULAR_TAGS_MATERIALIZED', False)
+
+# Queue search index updates in the SearchIndexOperation table instead of
+# sending them inline; the process_search_index_queue command sends them
+# to the backends. Every backend in WAGTAILSEARCH_BACKENDS must set
+# AUTO_UPDATE to False, so that Wagtail does not also update it on save.
+SEARCH_INDEX_QUEUE = getattr(settings, 'SEARCH_INDEX_QUEUE', False)
@@ -2,26 +2,283 @@
 Contains application configuration.
 """
 from django.apps import AppConfig
+from django.apps import apps
 from django.db import models
 
+from .app_settings import COUNT_STRATEGIES
+from .app_settings import POPULAR_TAGS_MATERIALIZED
+from .app_settings import RELATED_ITEMS_MATERIALIZED
+from .app_settings import RICH_TEXT_CACHE
+from .app_settings import SEARCH_INDEX_QUEUE
+
 
 class WagtailPlusAppConfig(AppConfig):
     name            = 'wagtailplus'
     label           = 'wagtailplus'
     verbose_name    = 'Wagtail Plus'
 
-    def _set_get_template(self):
+    def _register_models(self):
         """
-        Sets correct "get_template" method for CustomTemplateMixin models.
+        Sets correct "get_template" method for CustomTemplateMixin models
+        and records taggable page models with their tag through models,
+        the models that rich-text can link to and whether any model has
+        pre-rendered rich-text, walking the models once.
         """
+        from wagtail.wagtailcore.models import Page
+        from .fields import get_prerendered_fields
         from .mixins import CustomTemplateMixin
+        from .rich_text import LINK_HANDLERS
+
+        taggable_page_models    = []
+        page_through_models     = {}
+        link_target_models      = []
+        has_prerendered_fields  = False
+        link_models             = tuple(
+            handler.model for handler in LINK_HANDLERS.values()
+        )
 
-        for model in models.get_models():
+        for model in apps.get_models():
             if issubclass(model, CustomTemplateMixin):
                 model.get_template = CustomTemplateMixin.get_template
 
+            if issubclass(model, link_models):
+                link_target_models.append(model)
+
+            if get_prerendered_fields(model):
+                has_prerendered_fields = True
+
+            # Is model derived from Page class, with a "tags" attribute?
+            if issubclass(model, Page) and model != Page and hasattr(model, 'tags'):
+                through = getattr(model.tags, 'through', None)
+                taggable_page_models.append((model, through))
+
+        for model, through in taggable_page_models:
+            try:
+                field = through._meta.get_field('content_object')
+            except (AttributeError, models.FieldDoesNotExist):
+                continue
+
+            # Generic through models (such as TaggedItem) have no target.
+            target = getattr(field.rel, 'to', None)
+            if isinstance(target, type) and issubclass(target, Page):
+                page_through_models[target] = through
+
+        self.taggable_page_models   = tuple(taggable_page_models)
+        self.page_through_models    = page_through_models
+        self.link_target_models     = tuple(link_target_models)
+        self.has_prerendered_fields = has_prerendered_fields
+
+    def _connect_rich_text_cache(self):
+        """
+        Connects receivers that invalidate cached rich-text when linked
+        instances or sites are saved or deleted.
+        """
+        from wagtail.wagtailcore.models import Page
+        from wagtail.wagtailcore.models import Site
+        from .cache import invalidate_rich_text
+        from .cache import record_page_url_change
+
+        for model in self.link_target_models:
+            label = '{0}_{1}'.format(model._meta.app_label, model._meta.model_name)
+
+            # Detects page moves and slug changes, which change the URLs
+            # of every descendant page; pre-rendered rich-text uses it too.
+            if issubclass(model, Page):
+                models.signals.pre_save.connect(
+                    record_page_url_change,
+                    sender          = model,
+                    dispatch_uid    = 'wagtailplus_record_page_url_change_{0}'.format(label)
+                )
+
+            if RICH_TEXT_CACHE:
+                models.signals.post_save.connect(
+                    invalidate_rich_text,
+                    sender          = model,
+                    dispatch_uid    = 'wagtailplus_invalidate_rich_text_save_{0}'.format(label)
+                )
+                models.signals.post_delete.connect(
+                    invalidate_rich_text,
+                    sender          = model,
+                    dispatch_uid    = 'wagtailplus_invalidate_rich_text_delete_{0}'.format(label)
+                )
+
+        if RICH_TEXT_CACHE:
+            models.signals.post_save.connect(
+                invalidate_rich_text,
+                sender          = Site,
+                dispatch_uid    = 'wagtailplus_invalidate_rich_text_save_site'
+            )
+            models.signals.post_delete.connect(
+                invalidate_rich_text,
+                sender          = Site,
+                dispatch_uid    = 'wagtailplus_invalidate_rich_text_delete_site'
+            )
+
+    def _connect_page_url_cache(self):
+        """
+        Connects receivers that invalidate cached page URLs.
+        """
+        from wagtail.wagtailcore.signals import page_published
+        from wagtail.wagtailcore.signals import page_unpublished
+        from .cache import invalidate_page_urls
+
+        models.signals.post_save.connect(
+            invalidate_page_urls,
+            dispatch_uid    = 'wagtailplus_invalidate_page_urls_save'
+        )
+        models.signals.post_delete.connect(
+            invalidate_page_urls,
+            dispatch_uid    = 'wagtailplus_invalidate_page_urls_delete'
+        )
+        page_published.connect(
+            invalidate_page_urls,
+            dispatch_uid    = 'wagtailplus_invalidate_page_urls_publish'
+        )
+        page_unpublished.connect(
+            invalidate_page_urls,
+            dispatch_uid    = 'wagtailplus_invalidate_page_urls_unpublish'
+        )
+
+    def _connect_related_items(self):
+        """
+        Connects receivers that maintain the materialized related items.
+        """
+        from .models.related_item import add_related_items
+        from .models.related_item import remove_related_items
+
+        models.signals.post_save.connect(
+            add_related_items,
+            dispatch_uid    = 'wagtailplus_add_related_items'
+        )
+        models.signals.post_delete.connect(
+            remove_related_items,
+            dispatch_uid    = 'wagtailplus_remove_related_items'
+        )
+
+    def _connect_model_counters(self):
+        """
+        Connects receivers that maintain counters of models whose count
+        strategy is "counter".
+        """
+        from .counters import COUNT_COUNTER
+        from .counters import decrement_counter
+        from .counters import increment_counter
+
+        for label, strategy in COUNT_STRATEGIES.items():
+            if strategy != COUNT_COUNTER:
+                continue
+
+            model = apps.get_model(label)
+
+            models.signals.post_save.connect(
+                increment_counter,
+                sender          = model,
+                dispatch_uid    = 'wagtailplus_increment_counter_{0}'.format(label)
+            )
+            models.signals.post_delete.connect(
+                decrement_counter,
+                sender          = model,
+                dispatch_uid    = 'wagtailplus_decrement_counter_{0}'.format(label)
+            )
+
+    def _connect_tag_counts(self):
+        """
+        Connects receivers that maintain tag counts.
+        """
+        from taggit.models import TaggedItem
+        from .models.tag_count import decrement_tag_count
+        from .models.tag_count import increment_tag_count
+
+        models.signals.post_save.connect(
+            increment_tag_count,
+            sender          = TaggedItem,
+            dispatch_uid    = 'wagtailplus_increment_tag_count'
+        )
+        models.signals.post_delete.connect(
+            decrement_tag_count,
+            sender          = TaggedItem,
+            dispatch_uid    = 'wagtailplus_decrement_tag_count'
+        )
+
+    def _connect_rich_text_references(self):
+        """
+        Connects receivers that maintain the rich-text reference index.
+        """
+        from wagtail.wagtailcore.models import Site
+        from .models.rich_text_reference import delete_rich_text_references
+        from .models.rich_text_reference import mark_rich_text_stale
+        from .models.rich_text_reference import update_rich_text_references
+
+        models.signals.post_save.connect(
+            update_rich_text_references,
+            dispatch_uid    = 'wagtailplus_update_rich_text_references'
+        )
+        models.signals.post_delete.connect(
+            delete_rich_text_references,
+            dispatch_uid    = 'wagtailplus_delete_rich_text_references'
+        )
+
+        if not self.has_prerendered_fields:
+            return
+
+        # Flag pre-rendered content when linked instances or sites change.
+        for model in self.link_target_models + (Site,):
+            label = '{0}_{1}'.format(model._meta.app_label, model._meta.model_name)
+
+            models.signals.post_save.connect(
+                mark_rich_text_stale,
+                sender          = model,
+                dispatch_uid    = 'wagtailplus_mark_rich_text_stale_save_{0}'.format(label)
+            )
+            models.signals.post_delete.connect(
+                mark_rich_text_stale,
+                sender          = model,
+                dispatch_uid    = 'wagtailplus_mark_rich_text_stale_delete_{0}'.format(label)
+            )
+
+    def _connect_search_index_queue(self):
+        """
+        Connects receivers that queue index updates of indexed models;
+        the backends' own auto-update must be disabled.
+        """
+        from wagtail.wagtailsearch.index import get_indexed_models
+        from .search_index import check_queue_backends
+        from .search_index import queue_index_add
+        from .search_index import queue_index_delete
+
+        check_queue_backends()
+
+        for model in get_indexed_models():
+            label = '{0}_{1}'.format(model._meta.app_label, model._meta.model_name)
+
+            models.signals.post_save.connect(
+                queue_index_add,
+                sender          = model,
+                dispatch_uid    = 'wagtailplus_queue_index_add_{0}'.format(label)
+            )
+            models.signals.post_delete.connect(
+                queue_index_delete,
+                sender          = model,
+                dispatch_uid    = 'wagtailplus_queue_index_delete_{0}'.format(label)
+            )
+
     def ready(self):
         """
         Finalizes application setup.
         """
-        self._set_get_template()
\ No newline at end of file
+        self._register_models()
+
+        if RICH_TEXT_CACHE or self.has_prerendered_fields:
+            self._connect_rich_text_cache()
+        self._connect_page_url_cache()
+        self._connect_rich_text_references()
+        self._connect_model_counters()
+
+        if POPULAR_TAGS_MATERIALIZED:
+            self._connect_tag_counts()
+
+        if RELATED_ITEMS_MATERIALIZED:
+            self._connect_related_items()
+
+        if SEARCH_INDEX_QUEUE:
+            self._connect_search_index_queue()
\ No newline at end of file
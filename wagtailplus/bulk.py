@@ -0,0 +1,302 @@
+"""
+Contains set-based operations on many instances of a model.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db import router
+from django.db import transaction
+from django.db.models.deletion import Collector
+from django.db.models.deletion import get_candidate_relations_to_delete
+
+from .app_settings import POPULAR_TAGS_MATERIALIZED
+from .app_settings import RELATED_ITEMS_MATERIALIZED
+from .search_index import remove_from_index
+from .search_index import update_index
+
+
+def iter_chunks(pks, size=500):
+    """
+    Yields lists of at most specified size from specified primary keys,
+    keeping "IN" clauses within database parameter limits.
+
+    :param pks: list of primary keys.
+    :param size: the number of keys per list.
+    :rtype: generator.
+    """
+    for i in range(0, len(pks), size):
+        yield pks[i:i + size]
+
+def get_tagged_items(model, tag, pks):
+    """
+    Returns queryset of through model instances tagging specified
+    instances of specified model with specified tag, or with any tag if
+    tag is None, and the name of the through model field holding the
+    object ID.
+
+    :param model: the model class.
+    :param tag: the tag instance or None.
+    :param pks: list of primary keys.
+    :rtype: tuple.
+    """
+    through = model.tags.through
+
+    if hasattr(through, 'content_type'):
+        field   = 'object_id'
+        qs      = through.objects.filter(
+            content_type = ContentType.objects.get_for_model(model)
+        )
+    else:
+        field   = 'content_object'
+        qs      = through.objects.all()
+
+    if tag is not None:
+        qs = qs.filter(tag=tag)
+
+    return qs.filter(**{'{0}__in'.format(field): pks}), field
+
+def adjust_tag_tables(model, tag, pks, delta):
+    """
+    Updates the materialized tag counts and related items when the tag
+    of specified instances is added or removed in bulk, as the signals
+    maintaining them are not sent. Call this while the instances are
+    tagged: after adding the tag, or before removing it.
+
+    :param model: the model class.
+    :param tag: the tag instance.
+    :param pks: list of primary keys.
+    :param delta: 1 for an added tag, -1 for a removed one.
+    """
+    from taggit.models import TaggedItem
+    from wagtailplus.models import RelatedItem
+    from wagtailplus.models import TagCount
+
+    if not pks:
+        return
+
+    content_type = ContentType.objects.get_for_model(model)
+
+    if POPULAR_TAGS_MATERIALIZED and model.tags.through is TaggedItem:
+        TagCount.objects.adjust(content_type.id, tag.id, delta * len(pks))
+
+    if RELATED_ITEMS_MATERIALIZED:
+        RelatedItem.objects.adjust_for_tag(tag.id, content_type.id, pks, delta)
+
+def delete_tags(model, pks):
+    """
+    Deletes the tags of specified instances of specified model, adjusting
+    the materialized tag counts.
+
+    :param model: the model class.
+    :param pks: list of primary keys.
+    """
+    from taggit.models import TaggedItem
+    from wagtailplus.models import TagCount
+
+    qs, field = get_tagged_items(model, None, pks)
+
+    if POPULAR_TAGS_MATERIALIZED and model.tags.through is TaggedItem:
+        content_type    = ContentType.objects.get_for_model(model)
+        rows            = qs.values_list('tag').annotate(
+            count = models.Count('pk')
+        ).order_by()
+
+        for tag_id, count in rows:
+            TagCount.objects.adjust(content_type.id, tag_id, -count)
+
+    qs._raw_delete(qs.db)
+
+def delete_related(model, pks):
+    """
+    Deletes or updates the rows of other models that reference specified
+    instances of specified model through Django's collector, so that
+    their delete signals and on_delete rules still apply. Relations
+    without rows cost one query each.
+
+    :param model: the model class.
+    :param pks: list of primary keys.
+    """
+    using       = router.db_for_write(model)
+    collector   = Collector(using=using)
+    objs        = [model(pk=pk) for pk in pks]
+
+    for related in get_candidate_relations_to_delete(model._meta):
+        field = related.field
+        if field.rel.on_delete is models.DO_NOTHING:
+            continue
+
+        sub_objs = collector.related_objects(related, objs)
+        if sub_objs.exists():
+            field.rel.on_delete(collector, field, sub_objs, using)
+
+    # Generic relations, such as comments or revisions of other apps.
+    for field in model._meta.virtual_fields:
+        if hasattr(field, 'bulk_related_objects'):
+            collector.collect(
+                field.bulk_related_objects(objs, using),
+                source      = model,
+                source_attr = field.rel.related_name,
+                nullable    = True
+            )
+
+    collector.delete()
+
+def delete_rows(model, pks):
+    """
+    Deletes specified instances of specified model without fetching them
+    or sending their delete signals, and does the clean-up the signal
+    receivers of wagtailplus would have done with one query per table.
+
+    Only the model's own rows, its tag through rows and the wagtailplus
+    bookkeeping tables are deleted directly; rows of other models that
+    depend on them, and multi-table parents, go through the collector.
+
+    :param model: the model class.
+    :param pks: list of primary keys.
+    """
+    from wagtailplus.cache import invalidate_rich_text_targets
+    from wagtailplus.counters import COUNT_COUNTER
+    from wagtailplus.counters import get_count_strategy
+    from wagtailplus.fields import get_rich_text_fields
+    from wagtailplus.models import ModelCounter
+    from wagtailplus.models import RelatedItem
+    from wagtailplus.models import RichTextReference
+
+    qs  = model._base_manager.filter(pk__in=pks)
+    pks = list(qs.values_list('pk', flat=True))
+    if not pks:
+        return
+
+    # Multi-table parents are deleted once their children are gone.
+    parents = [
+        (parent, list(qs.values_list(field.attname, flat=True)))
+        for parent, field in model._meta.parents.items()
+        if field is not None
+    ]
+
+    if hasattr(model, 'tags'):
+        delete_tags(model, pks)
+
+    delete_related(model, pks)
+    qs._raw_delete(qs.db)
+
+    if get_rich_text_fields(model):
+        RichTextReference.objects.delete_for_objects(model, pks)
+
+    RichTextReference.objects.mark_stale_for_targets(model, pks)
+    invalidate_rich_text_targets(model, pks)
+
+    if RELATED_ITEMS_MATERIALIZED:
+        RelatedItem.objects.delete_for_objects(model, pks)
+
+    if get_count_strategy(model) == COUNT_COUNTER:
+        ModelCounter.objects.adjust(model, -len(pks))
+
+    for parent, parent_pks in parents:
+        parent._base_manager.using(qs.db).filter(pk__in=parent_pks).delete()
+
+def bulk_delete(model, pks):
+    """
+    Deletes instances of specified model in one transaction, chunk by
+    chunk, and removes them from the search index.
+
+    Rows are deleted with set-based queries rather than through the
+    collector, which would load every instance and send its delete
+    signals; delete_rows() does the work of the receivers instead.
+    Tree models, such as pages, keep their standard deletion, which
+    maintains the tree.
+
+    :param model: the model class.
+    :param pks: list of primary keys.
+    :rtype: int.
+    """
+    from treebeard.mp_tree import MP_Node
+
+    if issubclass(model, MP_Node):
+        with transaction.atomic():
+            for chunk in iter_chunks(pks):
+                model._default_manager.filter(pk__in=chunk).delete()
+
+        # The delete signals remove the instances from the index.
+        return len(pks)
+
+    with transaction.atomic():
+        for chunk in iter_chunks(pks):
+            delete_rows(model, chunk)
+
+    remove_from_index(model, pks)
+
+    return len(pks)
+
+def bulk_add_tag(model, pks, name):
+    """
+    Adds tag with specified name to instances of specified model that do
+    not have it yet, in one transaction, and reindexes them.
+
+    :param model: the model class.
+    :param pks: list of primary keys.
+    :param name: the tag name.
+    :rtype: int.
+    """
+    from taggit.models import Tag
+
+    through = model.tags.through
+    added   = []
+
+    with transaction.atomic():
+        tag, created = Tag.objects.get_or_create(name=name)
+
+        content_type = ContentType.objects.get_for_model(model)
+
+        for chunk in iter_chunks(pks):
+            qs, field   = get_tagged_items(model, tag, chunk)
+            existing    = set(qs.values_list(field, flat=True))
+            new         = [pk for pk in chunk if pk not in existing]
+
+            if hasattr(through, 'content_type'):
+                items = [
+                    through(content_type=content_type, object_id=pk, tag=tag)
+                    for pk in new
+                ]
+            else:
+                items = [through(content_object_id=pk, tag=tag) for pk in new]
+
+            through.objects.bulk_create(items)
+            adjust_tag_tables(model, tag, new, 1)
+            added += new
+
+    update_index(model, added)
+
+    return len(added)
+
+def bulk_remove_tag(model, pks, name):
+    """
+    Removes tag with specified name from instances of specified model in
+    one transaction, and reindexes them.
+
+    :param model: the model class.
+    :param pks: list of primary keys.
+    :param name: the tag name.
+    :rtype: int.
+    """
+    from taggit.models import Tag
+
+    tag = Tag.objects.filter(name=name).first()
+    if tag is None:
+        return 0
+
+    removed = []
+
+    with transaction.atomic():
+        for chunk in iter_chunks(pks):
+            qs, field   = get_tagged_items(model, tag, chunk)
+            ids         = list(qs.values_list(field, flat=True))
+
+            # Delete without fetching rows or sending signals, once the
+            # tables the signals maintain are adjusted.
+            adjust_tag_tables(model, tag, ids, -1)
+            qs._raw_delete(qs.db)
+            removed += ids
+
+    update_index(model, removed)
+
+    return len(removed)
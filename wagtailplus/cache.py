@@ -0,0 +1,373 @@
+"""
+Contains cache-related functions.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import caches
+from django.utils.encoding import force_bytes
+from django.utils import six
+from django.utils.encoding import force_text
+
+from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.models import Site
+
+from .app_settings import PAGE_URL_CACHE
+from .app_settings import PAGE_URL_CACHE_TIMEOUT
+from .app_settings import RICH_TEXT_CACHE
+from .app_settings import RICH_TEXT_CACHE_TIMEOUT
+from .app_settings import RICH_TEXT_CLEAN_CACHE
+from .app_settings import RICH_TEXT_CLEAN_CACHE_TIMEOUT
+from .rich_text import LINK_HANDLERS
+from .rich_text import expand_db_html
+from .rich_text import get_link_ids
+
+
+# Version token shared by every rich-text entry; page URLs depend on the
+# sites' hostnames, ports and root pages.
+SITE_DEPENDENCY_KEY = 'wagtailplus:rich-text-dependency:sites'
+
+def get_rich_text_cache():
+    """
+    Returns cache instance for rendered rich-text, if enabled.
+
+    :rtype: django.core.cache.backends.base.BaseCache.
+    """
+    if RICH_TEXT_CACHE:
+        return caches[RICH_TEXT_CACHE]
+    return None
+
+def get_rich_text_key(html):
+    """
+    Returns cache key for specified database-representation HTML.
+
+    :param html: the HTML source.
+    :rtype: str.
+    """
+    digest = hashlib.sha1(force_bytes(html)).hexdigest()
+    return 'wagtailplus:rich-text:{0}'.format(digest)
+
+def get_dependency_key(link_type, pk):
+    """
+    Returns cache key holding the version token of a linked instance.
+
+    :param link_type: the link type.
+    :param pk: the instance primary key.
+    :rtype: str.
+    """
+    return 'wagtailplus:rich-text-dependency:{0}:{1}'.format(
+        link_type,
+        force_text(pk)
+    )
+
+def get_dependency_keys(html):
+    """
+    Returns list of dependency keys for instances linked in specified
+    HTML, and for the sites.
+
+    :param html: the HTML source.
+    :rtype: list.
+    """
+    keys = [SITE_DEPENDENCY_KEY]
+
+    for link_type, ids in get_link_ids(html).items():
+        model = LINK_HANDLERS[link_type].model
+        for pk in ids:
+            keys.append(get_dependency_key(
+                link_type,
+                model._meta.pk.to_python(pk)
+            ))
+
+    return keys
+
+def get_dependency_versions(cache, keys):
+    """
+    Returns dictionary of version tokens for specified dependency keys,
+    creating tokens for keys that do not have one yet.
+
+    :param cache: the cache instance.
+    :param keys: list of dependency keys.
+    :rtype: dict.
+    """
+    versions    = cache.get_many(keys)
+    missing     = [key for key in keys if key not in versions]
+
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        versions.update(cache.get_many(missing))
+
+    return versions
+
+def get_rendered_html(html):
+    """
+    Returns front-end HTML for specified database-representation HTML,
+    served from the rich-text cache when possible.
+
+    Each entry records a version token for every linked Link, Page and
+    Document; saving or deleting one of them discards its token, which
+    invalidates only the entries that depend on it. Saving or deleting a
+    site discards the token shared by all entries.
+
+    :param html: the HTML source.
+    :rtype: str.
+    """
+    cache = get_rich_text_cache()
+    if cache is None:
+        return expand_db_html(html)
+
+    key     = get_rich_text_key(html)
+    entry   = cache.get(key)
+
+    if entry is not None:
+        rendered, versions = entry
+        if cache.get_many(list(versions)) == versions:
+            return rendered
+
+    keys        = get_dependency_keys(html)
+    versions    = get_dependency_versions(cache, keys)
+    rendered    = expand_db_html(html)
+
+    # Only cache entries whose dependencies can all be tracked.
+    if len(versions) == len(keys):
+        cache.set(key, (rendered, versions), RICH_TEXT_CACHE_TIMEOUT)
+
+    return rendered
+
+def get_subtree_page_ids(page):
+    """
+    Returns list of IDs of specified page and all of its descendants.
+
+    :param page: the page instance.
+    :rtype: list.
+    """
+    return list(Page.objects.filter(
+        path__startswith = page.path
+    ).values_list('pk', flat=True))
+
+def record_page_url_change(sender, instance, **kwargs):
+    """
+    Flags a page whose URL path is about to change, as when it is moved
+    or its slug changes, which also changes the URLs of its descendants.
+
+    :param sender: the sending class.
+    :param instance: the page instance about to be saved.
+    """
+    if not isinstance(instance, Page) or instance.pk is None or kwargs.get('raw', False):
+        return
+
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'url_path' not in update_fields:
+        instance._url_path_changed = False
+        return
+
+    old_url_path = Page.objects.filter(
+        pk = instance.pk
+    ).values_list('url_path', flat=True).first()
+
+    instance._url_path_changed = old_url_path not in (None, instance.url_path)
+
+def invalidate_rich_text(sender, instance, **kwargs):
+    """
+    Invalidates cached rich-text that links to specified instance, or to
+    any page under a page whose URL path changed, or all cached rich-text
+    when a site changes.
+
+    :param sender: the sending class.
+    :param instance: the saved or deleted instance.
+    """
+    cache = get_rich_text_cache()
+    if cache is None:
+        return
+
+    if isinstance(instance, Site):
+        cache.delete(SITE_DEPENDENCY_KEY)
+        return
+
+    keys = []
+    for link_type, handler in LINK_HANDLERS.items():
+        if isinstance(instance, handler.model):
+            keys.append(get_dependency_key(link_type, instance.pk))
+
+            if getattr(instance, '_url_path_changed', False):
+                keys += [
+                    get_dependency_key(link_type, pk)
+                    for pk in get_subtree_page_ids(instance)
+                ]
+
+    if keys:
+        cache.delete_many(keys)
+
+def invalidate_rich_text_targets(model, pks):
+    """
+    Invalidates cached rich-text that links to instances of specified
+    model with specified primary keys, as when they are deleted in bulk.
+
+    :param model: the model class.
+    :param pks: list of primary keys.
+    """
+    cache = get_rich_text_cache()
+    if cache is None:
+        return
+
+    keys = [
+        get_dependency_key(link_type, pk)
+        for link_type, handler in LINK_HANDLERS.items()
+        if issubclass(model, handler.model)
+        for pk in pks
+    ]
+
+    if keys:
+        cache.delete_many(keys)
+
+def get_editor_html_key(html):
+    """
+    Returns cache key for specified editor-representation HTML.
+
+    Browsers submit textarea line breaks as CRLF, so line breaks are
+    normalized before hashing.
+
+    :param html: the editor HTML.
+    :rtype: str.
+    """
+    html    = html.replace('\r\n', '\n')
+    digest  = hashlib.sha1(force_bytes(html)).hexdigest()
+    return 'wagtailplus:rich-text-clean:{0}'.format(digest)
+
+def remember_db_html(editor_html, db_html):
+    """
+    Records the database representation that specified editor HTML was
+    expanded from, so that submitting it unchanged skips cleaning.
+
+    :param editor_html: the editor HTML.
+    :param db_html: the database-representation HTML.
+    """
+    if RICH_TEXT_CLEAN_CACHE:
+        caches[RICH_TEXT_CLEAN_CACHE].set(
+            get_editor_html_key(editor_html),
+            db_html,
+            RICH_TEXT_CLEAN_CACHE_TIMEOUT
+        )
+
+def get_remembered_db_html(editor_html):
+    """
+    Returns the database representation that specified editor HTML was
+    expanded from, or None if it was not rendered by the editor.
+
+    :param editor_html: the submitted editor HTML.
+    :rtype: str.
+    """
+    if not RICH_TEXT_CLEAN_CACHE:
+        return None
+
+    try:
+        db_html = caches[RICH_TEXT_CLEAN_CACHE].get(
+            get_editor_html_key(editor_html)
+        )
+    except Exception:
+        # Entries that cannot be read (such as ones pickled by other
+        # code versions) are misses; the submitted HTML is cleaned.
+        return None
+
+    if not isinstance(db_html, six.string_types):
+        return None
+
+    return db_html
+
+# Page fields that affect the URL of a page or its descendants.
+PAGE_URL_FIELDS = frozenset(['live', 'slug', 'url_path', 'path', 'depth'])
+
+PAGE_URL_GENERATION_KEY = 'wagtailplus:page-url-generation'
+
+def get_page_url_cache():
+    """
+    Returns cache instance for page URLs, if enabled.
+
+    :rtype: django.core.cache.backends.base.BaseCache.
+    """
+    if PAGE_URL_CACHE:
+        return caches[PAGE_URL_CACHE]
+    return None
+
+def get_page_url_generation(cache):
+    """
+    Returns the current page URL generation token, creating it if needed.
+
+    :param cache: the cache instance.
+    :rtype: str.
+    """
+    generation = cache.get(PAGE_URL_GENERATION_KEY)
+
+    if generation is None:
+        cache.add(PAGE_URL_GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(PAGE_URL_GENERATION_KEY)
+
+    return generation
+
+def get_page_url_key(generation, pk):
+    """
+    Returns cache key for the URL of specified page.
+
+    :param generation: the page URL generation token.
+    :param pk: the page primary key.
+    :rtype: str.
+    """
+    return 'wagtailplus:page-url:{0}:{1}'.format(generation, force_text(pk))
+
+def get_page_urls(pages):
+    """
+    Returns dictionary of URLs for specified pages keyed by ID, resolving
+    only those missing from the page URL cache.
+
+    Moving a page changes the URLs of all of its descendants, and a site
+    change can change any URL, so entries are not invalidated one by one;
+    instead every key includes a generation token that is replaced when
+    any URL may have changed.
+
+    :param pages: dictionary of pages keyed by ID.
+    :rtype: dict.
+    """
+    cache = get_page_url_cache()
+    if cache is None:
+        return dict((pk, page.url) for pk, page in pages.items())
+
+    generation  = get_page_url_generation(cache)
+    keys        = dict((get_page_url_key(generation, pk), pk) for pk in pages)
+    urls        = {}
+
+    for key, url in cache.get_many(list(keys)).items():
+        if url is not None:
+            urls[keys[key]] = url
+
+    missing = {}
+    for key, pk in keys.items():
+        if pk not in urls:
+            urls[pk] = missing[key] = pages[pk].url
+
+    if missing:
+        cache.set_many(missing, PAGE_URL_CACHE_TIMEOUT)
+
+    return urls
+
+def invalidate_page_urls(sender, instance=None, **kwargs):
+    """
+    Invalidates all cached page URLs when a page is published,
+    unpublished, moved or deleted, or a site changes.
+
+    :param sender: the sending class.
+    :param instance: the changed instance.
+    """
+    cache = get_page_url_cache()
+    if cache is None:
+        return
+
+    if isinstance(instance, Page):
+        # Saves that only touch other fields (such as new drafts) keep
+        # the cached URLs.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not PAGE_URL_FIELDS.intersection(update_fields):
+            return
+    elif not isinstance(instance, Site):
+        return
+
+    cache.set(PAGE_URL_GENERATION_KEY, uuid.uuid4().hex, None)
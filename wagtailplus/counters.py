@@ -0,0 +1,127 @@
+"""
+Contains functions that count model instances with a configurable
+strategy per model.
+
+The COUNT_STRATEGIES setting maps "app_label.model_name" to one of:
+
+* "exact": a COUNT(*) query (the default).
+* "counter": a ModelCounter row kept up to date by signals; run the
+  recount_models command after bulk inserts, which send no signals.
+* "estimate": the database's table statistics (PostgreSQL and MySQL),
+  falling back to an exact count for small or unsupported tables.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db import router
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+from .app_settings import COUNT_ESTIMATE_THRESHOLD
+from .app_settings import COUNT_STRATEGIES
+from .models.model_counter import ModelCounter
+
+
+COUNT_EXACT     = 'exact'
+COUNT_COUNTER   = 'counter'
+COUNT_ESTIMATE  = 'estimate'
+
+ESTIMATE_QUERIES = {
+    'postgresql':   'SELECT reltuples FROM pg_class WHERE relname = %s',
+    'mysql':        (
+        'SELECT table_rows FROM information_schema.tables '
+        'WHERE table_schema = DATABASE() AND table_name = %s'
+    ),
+}
+
+def get_count_strategy(model):
+    """
+    Returns count strategy for specified model.
+
+    :param model: the model class.
+    :rtype: str.
+    """
+    label = '{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+    return COUNT_STRATEGIES.get(label, COUNT_EXACT)
+
+def get_estimated_count(model):
+    """
+    Returns the database's estimate of the number of rows in specified
+    model's table, or None if it is not available.
+
+    :param model: the model class.
+    :rtype: int.
+    """
+    connection  = connections[router.db_for_read(model)]
+    sql         = ESTIMATE_QUERIES.get(connection.vendor)
+
+    if sql is None:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [model._meta.db_table])
+        row = cursor.fetchone()
+
+    if row is None or row[0] is None:
+        return None
+
+    return max(int(row[0]), 0)
+
+def get_count(model):
+    """
+    Returns number of instances of specified model, using its count
+    strategy.
+
+    :param model: the model class.
+    :rtype: int.
+    """
+    strategy = get_count_strategy(model)
+
+    if strategy == COUNT_COUNTER:
+        return ModelCounter.objects.get_count(model)
+
+    if strategy == COUNT_ESTIMATE:
+        count = get_estimated_count(model)
+        # Statistics are unreliable for small or unanalyzed tables.
+        if count is not None and count >= COUNT_ESTIMATE_THRESHOLD:
+            return count
+
+    return model._default_manager.count()
+
+def increment_counter(sender, instance, **kwargs):
+    """
+    Increments the counter of specified instance's model when created.
+
+    :param sender: the sending class.
+    :param instance: the saved instance.
+    """
+    if kwargs.get('created', False):
+        ModelCounter.objects.adjust(sender, 1)
+
+def decrement_counter(sender, instance, **kwargs):
+    """
+    Decrements the counter of specified instance's model.
+
+    :param sender: the sending class.
+    :param instance: the deleted instance.
+    """
+    ModelCounter.objects.adjust(sender, -1)
+
+class ModelCountPaginator(Paginator):
+    """
+    Paginator that counts unfiltered querysets with the count strategy
+    of their model.
+    """
+    @cached_property
+    def count(self):
+        """
+        Returns total number of objects.
+
+        :rtype: int.
+        """
+        qs = self.object_list
+
+        if isinstance(qs, QuerySet) and not qs.query.where and not qs.query.distinct:
+            if qs.query.low_mark == 0 and qs.query.high_mark is None:
+                return get_count(qs.model)
+
+        return super(ModelCountPaginator, self).count
@@ -3,9 +3,13 @@ Contains form field related classes.
 """
 from django.db import models
 from django.forms import Textarea
+from django.utils import six
+from django.utils.safestring import SafeText
 
 from wagtail.wagtailadmin.edit_handlers import BaseRichTextFieldPanel
 
+from .cache import get_remembered_db_html
+from .cache import remember_db_html
 from .rich_text import FlexibleDbWhitelister
 from .rich_text import expand_db_html
 
@@ -42,6 +46,9 @@ class FlexibleRichTextArea(Textarea):
             translated_value = None
         else:
             translated_value = expand_db_html(value, for_editor=True)
+            # Remember the plain source, not the pre-rendered value
+            # it may carry.
+            remember_db_html(translated_value, six.text_type(value))
 
         return super(FlexibleRichTextArea, self).render(
             name,
@@ -51,7 +58,9 @@ class FlexibleRichTextArea(Textarea):
 
     def value_from_datadict(self, data, files, name):
         """
-        Returns cleaned value.
+        Returns cleaned value. If the submitted value is exactly what
+        render() produced, the stored value is returned without
+        re-parsing it.
 
         :param data: data dictionary.
         :param files: files dictionary.
@@ -67,12 +76,195 @@ class FlexibleRichTextArea(Textarea):
         if original_value is None:
             return None
 
+        db_value = get_remembered_db_html(original_value)
+        if db_value is not None:
+            return db_value
+
         return FlexibleDbWhitelister.clean(original_value)
 
+class RenderedRichText(SafeText):
+    """
+    Front-end HTML that has already been expanded from its database
+    representation.
+    """
+    pass
+
+class RichTextSource(six.text_type):
+    """
+    Database representation of a pre-rendered flexible rich-text field,
+    carrying the stored rendering so the flexiblerichtext filter can
+    serve it.
+    """
+    def __new__(cls, value, rendered):
+        instance            = super(RichTextSource, cls).__new__(cls, value)
+        instance.rendered   = rendered
+        return instance
+
+    def __reduce__(self):
+        """
+        Returns arguments for pickling, as __new__() requires the
+        rendering.
+
+        :rtype: tuple.
+        """
+        return (self.__class__, (six.text_type(self), self.rendered))
+
+class PrerenderedRichTextDescriptor(object):
+    """
+    Returns the value of a pre-rendered flexible rich-text field along
+    with its stored rendering, for as long as the value is unchanged.
+    """
+    def __init__(self, field):
+        """
+        Initializes the instance.
+
+        :param field: the flexible rich-text field.
+        """
+        self.field = field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        value       = instance.__dict__.get(self.field.attname)
+        rendered    = instance.__dict__.get(self.field.rendered_field_name)
+
+        if not value or not isinstance(rendered, RenderedRichText):
+            return value
+
+        return RichTextSource(value, rendered)
+
+    def __set__(self, instance, value):
+        current = instance.__dict__.get(self.field.attname)
+
+        # The stored rendering no longer matches; pre_save() renders the
+        # new value when the instance is saved.
+        if current is not None and current != value:
+            instance.__dict__[self.field.rendered_field_name] = ''
+
+        instance.__dict__[self.field.attname] = value
+
+class RenderedRichTextField(models.TextField):
+    """
+    Hidden companion column storing the front-end expansion of a
+    flexible rich-text field.
+    """
+    def __init__(self, source_field_name=None, *args, **kwargs):
+        """
+        Initializes the instance.
+
+        :param source_field_name: name of the flexible rich-text field.
+        """
+        self.source_field_name = source_field_name
+
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('default', '')
+        kwargs.setdefault('editable', False)
+
+        super(RenderedRichTextField, self).__init__(*args, **kwargs)
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        """
+        Adds field to specified class, unless already present.
+        """
+        if name not in [f.name for f in cls._meta.fields]:
+            super(RenderedRichTextField, self).contribute_to_class(
+                cls,
+                name,
+                **kwargs
+            )
+
+    def deconstruct(self):
+        """
+        Returns field deconstruction for migrations.
+
+        :rtype: tuple.
+        """
+        name, path, args, kwargs = super(RenderedRichTextField, self).deconstruct()
+        kwargs['source_field_name'] = self.source_field_name
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection, context):
+        """
+        Returns stored value marked as rendered HTML.
+        """
+        if value is None:
+            return value
+        return RenderedRichText(value)
+
+    def pre_save(self, model_instance, add):
+        """
+        Renders the source field and returns the rendered HTML.
+
+        :param model_instance: the model instance.
+        :param add: flag for new instances.
+        :rtype: str.
+        """
+        source  = getattr(model_instance, self.source_field_name)
+        value   = RenderedRichText(expand_db_html(source) if source else '')
+
+        setattr(model_instance, self.attname, value)
+
+        return value
+
 class FlexibleRichTextField(models.TextField):
     """
     Prevents automatic replacement of 'DIV' tags with 'P' tags.
+
+    With prerender=True, the front-end expansion is also stored in a
+    hidden "<name>_rendered" column at save time. The field's value then
+    carries that rendering, which the flexiblerichtext filter serves
+    without parsing or queries.
     """
+    def __init__(self, *args, **kwargs):
+        """
+        Initializes the instance.
+        """
+        self.prerender = kwargs.pop('prerender', False)
+        super(FlexibleRichTextField, self).__init__(*args, **kwargs)
+
+    @property
+    def rendered_field_name(self):
+        """
+        Returns name of the companion rendered column, if any.
+
+        :rtype: str.
+        """
+        if self.prerender:
+            return '{0}_rendered'.format(self.name)
+        return None
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        """
+        Adds field to specified class, along with its companion
+        rendered column when pre-rendering is enabled.
+        """
+        super(FlexibleRichTextField, self).contribute_to_class(
+            cls,
+            name,
+            **kwargs
+        )
+
+        # Abstract models pass their fields on to concrete subclasses,
+        # which add their own companion column.
+        if self.prerender and not cls._meta.abstract:
+            cls.add_to_class(
+                self.rendered_field_name,
+                RenderedRichTextField(source_field_name=name)
+            )
+            setattr(cls, self.attname, PrerenderedRichTextDescriptor(self))
+
+    def deconstruct(self):
+        """
+        Returns field deconstruction for migrations.
+
+        :rtype: tuple.
+        """
+        name, path, args, kwargs = super(FlexibleRichTextField, self).deconstruct()
+        if self.prerender:
+            kwargs['prerender'] = True
+        return name, path, args, kwargs
+
     def formfield(self, **kwargs):
         """
         Uses FlexibleRichTextArea as default widget.
@@ -82,3 +274,25 @@ class FlexibleRichTextField(models.TextField):
         defaults.update(kwargs)
 
         return super(FlexibleRichTextField, self).formfield(**defaults)
+
+def get_rich_text_fields(model):
+    """
+    Returns list of flexible rich-text fields defined on specified model.
+
+    :param model: the model class.
+    :rtype: list.
+    """
+    return [
+        field for field in model._meta.fields
+        if isinstance(field, FlexibleRichTextField)
+    ]
+
+def get_prerendered_fields(model):
+    """
+    Returns list of pre-rendered flexible rich-text fields defined on
+    specified model.
+
+    :param model: the model class.
+    :rtype: list.
+    """
+    return [field for field in get_rich_text_fields(model) if field.prerender]
@@ -0,0 +1,58 @@
+"""
+Contains helper functions for generic relations.
+"""
+import collections
+
+from django.contrib.contenttypes.models import ContentType
+
+from .app_settings import GENERIC_SELECT_RELATED
+
+
+def get_select_related(model):
+    """
+    Returns tuple of related fields to select with instances of specified
+    model, from the GENERIC_SELECT_RELATED setting.
+
+    :param model: the model class.
+    :rtype: tuple.
+    """
+    label = '{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+    return tuple(GENERIC_SELECT_RELATED.get(label, ()))
+
+def load_generic_objects(keys, select_related=None):
+    """
+    Returns dictionary of instances keyed by (content type ID, object ID),
+    loaded with a single in_bulk() query per content type. Keys whose
+    content type or instance no longer exists are omitted.
+
+    :param keys: iterable of (content type ID, object ID) tuples.
+    :param select_related: optional dictionary of related fields keyed by
+        model, overriding the GENERIC_SELECT_RELATED setting.
+    :rtype: dict.
+    """
+    grouped = collections.defaultdict(set)
+    objects = {}
+
+    for content_type_id, object_id in keys:
+        grouped[content_type_id].add(object_id)
+
+    for content_type_id, object_ids in grouped.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+
+        # Skip stale content types.
+        if model is None:
+            continue
+
+        if select_related is not None and model in select_related:
+            fields = select_related[model]
+        else:
+            fields = get_select_related(model)
+
+        qs = model._base_manager.all()
+        if fields:
+            qs = qs.select_related(*fields)
+
+        for pk, obj in qs.in_bulk(list(object_ids)).items():
+            objects[(content_type_id, pk)] = obj
+
+    return objects
@@ -0,0 +1,47 @@
+"""
+Contains management command that computes tag similarity scores.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from wagtailplus.models.related_item import METHOD_JACCARD
+from wagtailplus.models.related_item import METHOD_TFIDF
+from wagtailplus.similarity import compute_similarity
+
+
+class Command(BaseCommand):
+    help = 'Computes the nearest neighbours of tagged objects by tag similarity.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--method',
+            choices = [METHOD_TFIDF, METHOD_JACCARD],
+            default = METHOD_TFIDF,
+            help    = 'Similarity measure.'
+        )
+        parser.add_argument(
+            '--neighbours',
+            type    = int,
+            default = 50,
+            help    = 'Number of related items stored per object.'
+        )
+        parser.add_argument(
+            '--block-size',
+            type    = int,
+            default = 500,
+            help    = 'Number of objects scored per block.'
+        )
+
+    def handle(self, *args, **options):
+        start = time.time()
+        total = compute_similarity(
+            options['method'],
+            options['neighbours'],
+            options['block_size']
+        )
+
+        self.stdout.write('Scored {0} object(s) in {1:.1f}s.'.format(
+            total,
+            time.time() - start
+        ))
@@ -0,0 +1,203 @@
+"""
+Contains management command that sends queued search index operations to
+the search backends.
+"""
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+
+from wagtail.wagtailsearch.backends import get_search_backend
+from wagtailplus.models import SearchIndexOperation
+from wagtailplus.search_index import delete_bulk
+from wagtailplus.search_index import get_index_queryset
+
+
+def load_group(key, object_ids):
+    """
+    Returns model class and instances for specified operation group;
+    deleted instances are represented by unsaved instances with their
+    primary key, which is all the backends need to remove them.
+
+    :param key: tuple of backend name, action and content type ID.
+    :param object_ids: set of object IDs.
+    :rtype: tuple.
+    """
+    action, content_type_id = key[1:]
+    model                   = ContentType.objects.get_for_id(content_type_id).model_class()
+
+    # Skip stale content types.
+    if model is None:
+        return None, []
+
+    if action == SearchIndexOperation.ACTION_DELETE:
+        return model, [model(pk=pk) for pk in object_ids]
+
+    return model, list(get_index_queryset(model).filter(pk__in=list(object_ids)))
+
+def send_group(group):
+    """
+    Sends specified operation group to its backend, returning the group
+    key and the error raised, if any.
+
+    :param group: tuple of key, backend, model class and instances.
+    :rtype: tuple.
+    """
+    key, backend, model, instances = group
+
+    try:
+        if key[1] == SearchIndexOperation.ACTION_DELETE:
+            delete_bulk(backend, model, instances)
+        elif instances:
+            backend.add_bulk(model, instances)
+    except Exception as e:
+        return key, e
+
+    return key, None
+
+class Command(BaseCommand):
+    help = 'Sends queued search index operations to the search backends.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type    = int,
+            default = 500,
+            help    = 'Number of queued operations per batch.'
+        )
+        parser.add_argument(
+            '--threads',
+            type    = int,
+            default = 4,
+            help    = 'Number of threads sending operations to backends.'
+        )
+        parser.add_argument(
+            '--interval',
+            type    = float,
+            default = 0,
+            help    = 'Seconds to wait for new operations once the queue '
+                      'is empty; exits when empty if 0.'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type    = int,
+            default = 5,
+            help    = 'Number of attempts before a failing operation is '
+                      'left in the queue for inspection.'
+        )
+        parser.add_argument(
+            '--retry-delay',
+            type    = float,
+            default = 1,
+            help    = 'Seconds to wait before retrying failed operations, '
+                      'doubled after each consecutive failed pass.'
+        )
+
+    def get_backend(self, name):
+        """
+        Returns search backend instance for specified name, shared by all
+        threads.
+
+        :param name: the search backend name.
+        :rtype: wagtail.wagtailsearch.backends.base.BaseSearch.
+        """
+        if name not in self.backends:
+            self.backends[name] = get_search_backend(name)
+
+        return self.backends[name]
+
+    def handle(self, *args, **options):
+        batch_size      = options['batch_size']
+        interval        = options['interval']
+        max_attempts    = max(options['max_attempts'], 1)
+        retry_delay     = options['retry_delay']
+        pool            = ThreadPool(options['threads'])
+        last            = 0
+        sent            = 0
+        failed          = 0
+        retries         = 0
+        pass_failed     = False
+
+        self.backends = {}
+
+        try:
+            while True:
+                groups, pks = SearchIndexOperation.objects.get_batch(
+                    last,
+                    batch_size,
+                    max_attempts
+                )
+
+                if not groups:
+                    last = 0
+
+                    # Start over to retry the operations that failed in this
+                    # pass; they drop out of the batches once they reach
+                    # the maximum number of attempts.
+                    if pass_failed:
+                        time.sleep(retry_delay * 2 ** min(retries, max_attempts))
+                        retries     += 1
+                        pass_failed = False
+                        continue
+
+                    retries = 0
+                    if not interval:
+                        break
+
+                    time.sleep(interval)
+                    continue
+
+                last = max(max(group_pks) for group_pks in pks.values())
+
+                # Database queries stay in this thread; only the backend
+                # requests are sent concurrently.
+                batch   = []
+                done    = []
+
+                for key, object_ids in groups.items():
+                    model, instances = load_group(key, object_ids)
+
+                    # Discard operations for stale content types.
+                    if model is None:
+                        done.append(key)
+                    else:
+                        batch.append((key, self.get_backend(key[0]), model, instances))
+
+                for key, error in pool.imap_unordered(send_group, batch):
+                    if error is None:
+                        done.append(key)
+                        sent += len(groups[key])
+                    else:
+                        failed      += len(groups[key])
+                        pass_failed = True
+                        SearchIndexOperation.objects.record_failure(pks[key], error)
+                        self.stderr.write('Failed to {0} {1} instance(s) on "{2}": {3}'.format(
+                            key[1],
+                            len(groups[key]),
+                            key[0],
+                            error
+                        ))
+
+                SearchIndexOperation.objects.filter(pk__in=[
+                    pk for key in done for pk in pks[key]
+                ]).delete()
+        finally:
+            pool.close()
+            pool.join()
+
+        abandoned = SearchIndexOperation.objects.filter(
+            attempts__gte = max_attempts
+        ).count()
+
+        self.stdout.write('Sent {0} search index operation(s), {1} failed attempt(s).'.format(
+            sent,
+            failed
+        ))
+
+        if abandoned:
+            self.stderr.write(
+                '{0} operation(s) failed {1} time(s) and were left in the '
+                'queue; see their "last_error".'.format(abandoned, max_attempts)
+            )
@@ -0,0 +1,81 @@
+"""
+Contains management command that rebuilds the materialized related items.
+"""
+import multiprocessing
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from wagtailplus.management.commands.rebuild_rich_text_references import iter_batches
+from wagtailplus.mixins import RelatedItemsMixin
+from wagtailplus.models import RelatedItem
+
+
+def get_related_models():
+    """
+    Returns list of concrete models that use RelatedItemsMixin.
+
+    :rtype: list.
+    """
+    return [
+        model for model in apps.get_models()
+        if not model._meta.proxy and issubclass(model, RelatedItemsMixin)
+    ]
+
+def rebuild_batch(batch):
+    """
+    Rebuilds related items for specified batch of instances.
+
+    :param batch: tuple of app label, model name and primary keys.
+    :rtype: int.
+    """
+    app_label, model_name, pks  = batch
+    model                       = apps.get_model(app_label, model_name)
+    instances                   = list(model._base_manager.filter(pk__in=pks))
+
+    RelatedItem.objects.update_for_instances(instances)
+
+    return len(instances)
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized items related by tags.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type    = int,
+            default = 500,
+            help    = 'Number of instances per batch.'
+        )
+        parser.add_argument(
+            '--workers',
+            type    = int,
+            default = multiprocessing.cpu_count(),
+            help    = 'Number of worker processes.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size  = options['batch_size']
+        workers     = options['workers']
+
+        for model in get_related_models():
+            # Worker processes must not share the parent's connections.
+            for connection in connections.all():
+                connection.close()
+
+            pool    = multiprocessing.Pool(workers)
+            total   = 0
+
+            try:
+                batches = iter_batches(model, batch_size)
+                for count in pool.imap_unordered(rebuild_batch, batches):
+                    total += count
+            finally:
+                pool.close()
+                pool.join()
+
+            self.stdout.write('Rebuilt related items for {0} {1} instance(s).'.format(
+                total,
+                model._meta.verbose_name
+            ))
@@ -0,0 +1,121 @@
+"""
+Contains management command that rebuilds the rich-text reference index.
+"""
+import multiprocessing
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from wagtail.wagtailcore.models import Page
+from wagtailplus.fields import get_rich_text_fields
+from wagtailplus.models import RichTextReference
+
+
+def get_rich_text_models():
+    """
+    Returns list of concrete models with flexible rich-text fields.
+
+    :rtype: list.
+    """
+    return [
+        model for model in apps.get_models()
+        if not model._meta.proxy and get_rich_text_fields(model)
+    ]
+
+def get_queryset(model):
+    """
+    Returns queryset of instances for specified model, excluding pages
+    that belong to a more specific page type.
+
+    :param model: the model class.
+    :rtype: django.db.models.query.QuerySet.
+    """
+    queryset = model._base_manager.order_by('pk')
+
+    if issubclass(model, Page):
+        content_type    = ContentType.objects.get_for_model(model)
+        queryset        = queryset.filter(content_type=content_type)
+
+    return queryset
+
+def iter_batches(model, batch_size):
+    """
+    Yields lists of primary keys for specified model, in key order.
+
+    :param model: the model class.
+    :param batch_size: the number of keys per batch.
+    :rtype: generator.
+    """
+    queryset    = get_queryset(model).values_list('pk', flat=True)
+    last_pk     = None
+
+    while True:
+        batch = queryset
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+
+        pks = list(batch[:batch_size])
+        if not pks:
+            break
+
+        last_pk = pks[-1]
+        yield model._meta.app_label, model._meta.model_name, pks
+
+def rebuild_batch(batch):
+    """
+    Rebuilds references for specified batch of instances.
+
+    :param batch: tuple of app label, model name and primary keys.
+    :rtype: int.
+    """
+    app_label, model_name, pks  = batch
+    model                       = apps.get_model(app_label, model_name)
+    instances                   = list(model._base_manager.filter(pk__in=pks))
+
+    RichTextReference.objects.update_for_instances(instances)
+
+    return len(instances)
+
+class Command(BaseCommand):
+    help = 'Rebuilds the index of links embedded in flexible rich-text fields.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type    = int,
+            default = 500,
+            help    = 'Number of instances per batch.'
+        )
+        parser.add_argument(
+            '--workers',
+            type    = int,
+            default = multiprocessing.cpu_count(),
+            help    = 'Number of worker processes.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size  = options['batch_size']
+        workers     = options['workers']
+
+        for model in get_rich_text_models():
+            # Worker processes must not share the parent's connections.
+            for connection in connections.all():
+                connection.close()
+
+            pool    = multiprocessing.Pool(workers)
+            total   = 0
+
+            try:
+                batches = iter_batches(model, batch_size)
+                for count in pool.imap_unordered(rebuild_batch, batches):
+                    total += count
+            finally:
+                pool.close()
+                pool.join()
+
+            self.stdout.write('Indexed {0} {1} instance(s).'.format(
+                total,
+                model._meta.verbose_name
+            ))
@@ -0,0 +1,422 @@
+"""
+Contains management command that re-cleans stored flexible rich-text
+content with the current whitelister rules.
+"""
+import collections
+import difflib
+import json
+import multiprocessing
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db import transaction
+from django.db.models import Case
+from django.db.models import Value
+from django.db.models import When
+from django.core.management.base import BaseCommand
+
+from wagtailplus.fields import get_rich_text_fields
+from wagtailplus.management.commands.rebuild_rich_text_references import get_queryset
+from wagtailplus.management.commands.rebuild_rich_text_references import get_rich_text_models
+from wagtailplus.models import RichTextReference
+from wagtailplus.rich_text import FlexibleDbWhitelister
+from wagtailplus.rich_text import LINK_HANDLERS
+from wagtailplus.rich_text import expand_db_html
+from wagtailplus.rich_text import iter_db_tags
+
+
+def get_label(model):
+    """
+    Returns checkpoint label for specified model.
+
+    :param model: the model class.
+    :rtype: str.
+    """
+    return '{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+
+def load_checkpoint(path):
+    """
+    Returns dictionary of last processed primary keys, keyed by model
+    label.
+
+    :param path: the checkpoint file path.
+    :rtype: dict.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(path, checkpoint):
+    """
+    Atomically writes specified checkpoint to file.
+
+    :param path: the checkpoint file path.
+    :param checkpoint: dictionary of last processed primary keys.
+    """
+    temp_path = '{0}.tmp'.format(path)
+
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f)
+
+    os.rename(temp_path, path)
+
+def iter_rows(model, field_names, batch_size, last_pk=None):
+    """
+    Yields lists of (pk, value, ...) rows for specified model, in key
+    order, starting after specified primary key.
+
+    :param model: the model class.
+    :param field_names: list of rich-text field names.
+    :param batch_size: the number of rows per batch.
+    :param last_pk: the last processed primary key.
+    :rtype: generator.
+    """
+    queryset = get_queryset(model).values_list('pk', *field_names)
+
+    while True:
+        batch = queryset
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+
+        rows = list(batch[:batch_size])
+        if not rows:
+            break
+
+        last_pk = rows[-1][0]
+        yield field_names, rows
+
+def get_references(html):
+    """
+    Returns set of (model, primary key) tuples for the instances linked
+    or embedded in specified HTML.
+
+    :param html: the HTML source.
+    :rtype: set.
+    """
+    from wagtail.wagtailimages.models import get_image_model
+
+    references = set()
+
+    for m, attrs in iter_db_tags(html):
+        if 'id' not in attrs:
+            continue
+        elif m.group(1) is not None and attrs['linktype'] in LINK_HANDLERS:
+            model = LINK_HANDLERS[attrs['linktype']].model
+        elif m.group(1) is None and attrs.get('embedtype') == 'image':
+            model = get_image_model()
+        else:
+            continue
+
+        try:
+            references.add((model, model._meta.pk.to_python(attrs['id'])))
+        except ValidationError:
+            continue
+
+    return references
+
+def get_missing_references(references):
+    """
+    Returns the subset of specified (model, primary key) tuples whose
+    instances do not exist, with one query per model.
+
+    :param references: set of (model, primary key) tuples.
+    :rtype: set.
+    """
+    ids     = collections.defaultdict(set)
+    missing = set()
+
+    for model, pk in references:
+        ids[model].add(pk)
+
+    for model, pks in ids.items():
+        existing = set(model._base_manager.filter(
+            pk__in = list(pks)
+        ).values_list('pk', flat=True))
+
+        missing.update((model, pk) for pk in pks - existing)
+
+    return missing
+
+def clean_rows(batch):
+    """
+    Re-cleans specified batch of rows, returning the last primary key,
+    the number of rows, a list of (pk, {field name: (old, new)}) tuples
+    for changed rows and a list of primary keys of rows left unchanged
+    because they link to missing instances.
+
+    Stored values are expanded to their editor representation first, as
+    that is what the whitelister operates on. Links and embeds whose
+    targets are missing would lose their attributes, so such rows are
+    only cleaned when "drop_missing" is set; the targets may have been
+    deleted temporarily.
+
+    :param batch: tuple of field names, rows and "drop_missing" flag.
+    :rtype: tuple.
+    """
+    field_names, rows, drop_missing = batch
+    changed                         = []
+    dangling                        = []
+    missing                         = set()
+
+    if not drop_missing:
+        references = dict(
+            (row[0], set().union(*[get_references(html) for html in row[1:] if html]))
+            for row in rows
+        )
+        missing = get_missing_references(set().union(*references.values()))
+
+    for row in rows:
+        if missing and references[row[0]] & missing:
+            dangling.append(row[0])
+            continue
+
+        values = {}
+
+        for name, html in zip(field_names, row[1:]):
+            if not html:
+                continue
+
+            cleaned = FlexibleDbWhitelister.clean(
+                expand_db_html(html, for_editor=True)
+            )
+            if cleaned != html:
+                values[name] = (html, cleaned)
+
+        if values:
+            changed.append((row[0], values))
+
+    return rows[-1][0], len(rows), changed, dangling
+
+def write_rows(model, changed):
+    """
+    Writes cleaned values for specified rows with a single UPDATE per
+    field, refreshing pre-rendered columns and link references. Rows
+    whose values changed since they were read are skipped, so concurrent
+    edits are not overwritten.
+
+    :param model: the model class.
+    :param changed: list of (pk, {field name: (old, new)}) tuples.
+    :rtype: list.
+    """
+    fields      = get_rich_text_fields(model)
+    field_names = [field.attname for field in fields]
+
+    with transaction.atomic():
+        # Lock the rows and keep those still holding the values read.
+        current = dict(
+            (row[0], dict(zip(field_names, row[1:])))
+            for row in model._base_manager.select_for_update().filter(
+                pk__in = [pk for pk, values in changed]
+            ).values_list('pk', *field_names)
+        )
+
+        fresh   = []
+        skipped = []
+
+        for pk, values in changed:
+            if pk in current and all(
+                current[pk].get(name) == old
+                for name, (old, new) in values.items()
+            ):
+                fresh.append((pk, values))
+            else:
+                skipped.append(pk)
+
+        if fresh:
+            update_rows(model, fresh)
+
+    return skipped
+
+def update_rows(model, changed):
+    """
+    Writes cleaned values for specified rows, each only where the row
+    still holds the old value.
+
+    :param model: the model class.
+    :param changed: list of (pk, {field name: (old, new)}) tuples.
+    """
+    updates = {}
+
+    for field in get_rich_text_fields(model):
+        whens       = []
+        rendered    = []
+
+        for pk, values in changed:
+            if field.name not in values:
+                continue
+
+            old, cleaned    = values[field.name]
+            condition       = {'pk': pk, field.attname: old}
+
+            whens.append(When(then=Value(cleaned), **condition))
+
+            # MySQL evaluates SET clauses in order, so the pre-rendered
+            # column cannot test the source column; the row is locked.
+            if field.prerender:
+                rendered.append(When(pk=pk, then=Value(expand_db_html(cleaned))))
+
+        if whens:
+            updates[field.attname] = Case(
+                *whens,
+                default         = field.attname,
+                output_field    = field
+            )
+        if rendered:
+            updates[field.rendered_field_name] = Case(
+                *rendered,
+                default         = field.rendered_field_name,
+                output_field    = field
+            )
+
+    pks = [pk for pk, values in changed]
+
+    model._base_manager.filter(pk__in=pks).update(**updates)
+    RichTextReference.objects.update_for_instances(
+        list(model._base_manager.filter(pk__in=pks))
+    )
+
+class Command(BaseCommand):
+    help = (
+        'Re-cleans stored flexible rich-text content with the current '
+        'whitelister rules. Rows linking to missing instances are left '
+        'unchanged unless --drop-missing is passed; use --dry-run to '
+        'review the changes first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type    = int,
+            default = 200,
+            help    = 'Number of rows per batch.'
+        )
+        parser.add_argument(
+            '--workers',
+            type    = int,
+            default = multiprocessing.cpu_count(),
+            help    = 'Number of worker processes.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default = 'reclean_rich_text.checkpoint',
+            help    = 'File recording progress, for resuming interrupted runs.'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action  = 'store_true',
+            default = False,
+            help    = 'Print a diff of the changes without saving them.'
+        )
+        parser.add_argument(
+            '--drop-missing',
+            action  = 'store_true',
+            default = False,
+            help    = 'Also clean rows linking to missing instances, which '
+                      'drops the attributes of those links and embeds.'
+        )
+
+    def write_diff(self, model, pk, values):
+        """
+        Writes unified diff of changed values for specified row.
+
+        :param model: the model class.
+        :param pk: the primary key.
+        :param values: dictionary of (old, new) values keyed by field name.
+        """
+        for name, (old, new) in sorted(values.items()):
+            label = '{0}:{1}:{2}'.format(get_label(model), pk, name)
+            lines = difflib.unified_diff(
+                old.splitlines(),
+                new.splitlines(),
+                fromfile    = label,
+                tofile      = label,
+                lineterm    = ''
+            )
+            for line in lines:
+                self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        batch_size      = options['batch_size']
+        workers         = options['workers']
+        dry_run         = options['dry_run']
+        drop_missing    = options['drop_missing']
+        checkpoint_path = options['checkpoint']
+        checkpoint      = {} if dry_run else load_checkpoint(checkpoint_path)
+
+        for model in get_rich_text_models():
+            label       = get_label(model)
+            field_names = [field.attname for field in get_rich_text_fields(model)]
+            total       = 0
+            updated     = 0
+            skipped     = []
+            dangling    = []
+
+            # Worker processes must not share the parent's connections.
+            for connection in connections.all():
+                connection.close()
+
+            pool = multiprocessing.Pool(workers)
+
+            try:
+                batches = (
+                    (names, rows, drop_missing)
+                    for names, rows in iter_rows(
+                        model,
+                        field_names,
+                        batch_size,
+                        checkpoint.get(label)
+                    )
+                )
+
+                # Results arrive in key order, so the checkpoint never
+                # skips a batch that is still being processed.
+                for last_pk, count, changed, missing in pool.imap(clean_rows, batches):
+                    total       += count
+                    dangling    += missing
+
+                    if dry_run:
+                        updated += len(changed)
+                        for pk, values in changed:
+                            self.write_diff(model, pk, values)
+                        continue
+
+                    if changed:
+                        stale   = write_rows(model, changed)
+                        updated += len(changed) - len(stale)
+                        skipped += stale
+
+                    checkpoint[label] = last_pk
+                    save_checkpoint(checkpoint_path, checkpoint)
+            finally:
+                pool.close()
+                pool.join()
+
+            self.stdout.write('{0} {1} of {2} {3} instance(s).'.format(
+                'Would update' if dry_run else 'Updated',
+                updated,
+                total,
+                model._meta.verbose_name
+            ))
+
+            if skipped:
+                self.stderr.write('Skipped {0} {1} instance(s) edited during the run: {2}'.format(
+                    len(skipped),
+                    model._meta.verbose_name,
+                    ', '.join(str(pk) for pk in skipped)
+                ))
+
+            if dangling:
+                self.stderr.write(
+                    'Left {0} {1} instance(s) linking to missing instances '
+                    'unchanged; use --drop-missing to clean them: {2}'.format(
+                        len(dangling),
+                        model._meta.verbose_name,
+                        ', '.join(str(pk) for pk in dangling)
+                    )
+                )
+
+        if not dry_run and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
@@ -0,0 +1,35 @@
+"""
+Contains management command that resets model counters.
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from wagtailplus.app_settings import COUNT_STRATEGIES
+from wagtailplus.counters import COUNT_COUNTER
+from wagtailplus.models import ModelCounter
+
+
+class Command(BaseCommand):
+    help = 'Resets the counters of models whose count strategy is "counter".'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'labels',
+            nargs   = '*',
+            help    = 'Models to recount, as "app_label.model_name".'
+        )
+
+    def handle(self, *args, **options):
+        labels = options['labels'] or [
+            label for label, strategy in COUNT_STRATEGIES.items()
+            if strategy == COUNT_COUNTER
+        ]
+
+        for label in labels:
+            model = apps.get_model(label)
+            count = ModelCounter.objects.reset(model)
+
+            self.stdout.write('Counted {0} {1} instance(s).'.format(
+                count,
+                model._meta.verbose_name
+            ))
@@ -0,0 +1,15 @@
+"""
+Contains management command that recomputes tag counts.
+"""
+from django.core.management.base import BaseCommand
+
+from wagtailplus.models import TagCount
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the number of items using each tag, per model.'
+
+    def handle(self, *args, **options):
+        total = TagCount.objects.recount()
+
+        self.stdout.write('Stored {0} tag count(s).'.format(total))
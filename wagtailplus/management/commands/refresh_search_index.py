@@ -0,0 +1,140 @@
+"""
+Contains management command that refreshes the search index entries of
+wagtailplus models in parallel batches. Entries are added or updated only;
+entries of deleted instances are left in place, so use Wagtail's
+update_index command to rebuild an index from scratch.
+"""
+import multiprocessing
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from wagtail.wagtailsearch.backends import get_search_backend
+from wagtail.wagtailsearch.index import class_is_indexed
+from wagtailplus.management.commands.rebuild_rich_text_references import get_queryset
+from wagtailplus.management.commands.rebuild_rich_text_references import iter_batches
+from wagtailplus.search_index import get_index_queryset
+from wagtailplus.search_index import get_search_backend_names
+
+
+def get_indexed_models(labels=None):
+    """
+    Returns list of concrete indexed models defined by wagtailplus apps,
+    or of the specified models that are indexed.
+
+    :param labels: optional list of "app_label.model_name" strings.
+    :rtype: list.
+    """
+    if labels:
+        return [
+            model for model in map(apps.get_model, labels)
+            if class_is_indexed(model)
+        ]
+
+    return [
+        model for model in apps.get_models()
+        if model.__module__.startswith('wagtailplus.')
+        and not model._meta.proxy
+        and class_is_indexed(model)
+    ]
+
+def index_batch(batch):
+    """
+    Adds specified batch of instances to the search backends.
+
+    :param batch: tuple of backend names, app label, model name and
+        primary keys.
+    :rtype: int.
+    """
+    backend_names, app_label, model_name, pks   = batch
+    model                                       = apps.get_model(app_label, model_name)
+    instances                                   = list(get_index_queryset(model).filter(pk__in=pks))
+
+    for name in backend_names:
+        get_search_backend(name).add_bulk(model, instances)
+
+    return len(instances)
+
+class Command(BaseCommand):
+    help = 'Adds or updates search index entries for wagtailplus models, ' \
+           'without removing stale entries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models',
+            nargs   = '*',
+            help    = 'Models to refresh, as "app_label.model_name"; '
+                      'defaults to all indexed wagtailplus models. Models '
+                      'that are not indexed are skipped.'
+        )
+        parser.add_argument(
+            '--backend',
+            action  = 'append',
+            dest    = 'backends',
+            help    = 'Search backend to update; defaults to all.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type    = int,
+            default = 500,
+            help    = 'Number of instances per batch.'
+        )
+        parser.add_argument(
+            '--workers',
+            type    = int,
+            default = multiprocessing.cpu_count(),
+            help    = 'Number of worker processes.'
+        )
+
+    def handle(self, *args, **options):
+        backend_names   = options['backends'] or get_search_backend_names()
+        batch_size      = options['batch_size']
+        workers         = options['workers']
+
+        for label in options['models']:
+            if not class_is_indexed(apps.get_model(label)):
+                self.stderr.write('Skipping "{0}", which is not indexed.'.format(label))
+
+        for model in get_indexed_models(options['models']):
+            for name in backend_names:
+                get_search_backend(name).add_type(model)
+
+            expected = get_queryset(model).count()
+
+            # Worker processes must not share the parent's connections.
+            for connection in connections.all():
+                connection.close()
+
+            pool    = multiprocessing.Pool(workers)
+            total   = 0
+            start   = time.time()
+
+            try:
+                batches = (
+                    (backend_names,) + batch
+                    for batch in iter_batches(model, batch_size)
+                )
+                for count in pool.imap_unordered(index_batch, batches):
+                    total   += count
+                    elapsed = time.time() - start
+
+                    self.stdout.write('{0}: {1}/{2} indexed ({3:.1f}/s)'.format(
+                        model._meta.verbose_name,
+                        total,
+                        expected,
+                        total / elapsed if elapsed else 0
+                    ))
+            finally:
+                pool.close()
+                pool.join()
+
+            for name in backend_names:
+                get_search_backend(name).refresh_index()
+
+            self.stdout.write('Indexed {0} {1} instance(s) in {2:.1f}s.'.format(
+                total,
+                model._meta.verbose_name,
+                time.time() - start
+            ))
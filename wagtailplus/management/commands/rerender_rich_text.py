@@ -0,0 +1,110 @@
+"""
+Contains management command that re-renders stale pre-rendered rich-text.
+"""
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+
+from wagtailplus.fields import get_prerendered_fields
+from wagtailplus.models import RichTextReference
+from wagtailplus.rich_text import expand_db_html
+
+
+def rerender_instances(content_type, object_ids):
+    """
+    Re-renders pre-rendered rich-text fields of specified instances,
+    writing only the columns whose output changed.
+
+    :param content_type: the content type instance.
+    :param object_ids: list of instance primary keys.
+    :rtype: int.
+    """
+    model = content_type.model_class()
+    if model is None:
+        return 0
+
+    fields = get_prerendered_fields(model)
+    if not fields:
+        return 0
+
+    updated = 0
+
+    for instance in model._base_manager.filter(pk__in=object_ids):
+        values = {}
+
+        for field in fields:
+            rendered = expand_db_html(getattr(instance, field.attname) or '')
+            if rendered != getattr(instance, field.rendered_field_name):
+                values[field.rendered_field_name] = rendered
+
+        # Update the columns directly to avoid save() side effects.
+        if values:
+            model._base_manager.filter(pk=instance.pk).update(**values)
+            updated += 1
+
+    return updated
+
+class Command(BaseCommand):
+    help = 'Re-renders pre-rendered rich-text that links to changed instances.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type    = int,
+            default = 100,
+            help    = 'Number of instances re-rendered per batch.'
+        )
+        parser.add_argument(
+            '--interval',
+            type    = int,
+            default = 0,
+            help    = 'Keep running, polling every INTERVAL seconds.'
+        )
+
+    def rerender(self, batch_size):
+        """
+        Re-renders all instances with stale references.
+
+        :param batch_size: number of instances per batch.
+        :rtype: int.
+        """
+        updated = 0
+
+        while True:
+            stale = list(RichTextReference.objects.filter(
+                is_stale=True
+            ).values_list('content_type', 'object_id').distinct()[:batch_size])
+
+            if not stale:
+                break
+
+            object_ids = {}
+            for content_type_id, object_id in stale:
+                object_ids.setdefault(content_type_id, []).append(object_id)
+
+            for content_type_id, ids in object_ids.items():
+                # Clear flags first, so that changes made while rendering
+                # are picked up by the next pass.
+                RichTextReference.objects.filter(
+                    content_type_id = content_type_id,
+                    object_id__in   = ids,
+                    is_stale        = True
+                ).update(is_stale=False)
+
+                content_type = ContentType.objects.get_for_id(content_type_id)
+                updated += rerender_instances(content_type, ids)
+
+        return updated
+
+    def handle(self, *args, **options):
+        batch_size  = options['batch_size']
+        interval    = options['interval']
+
+        while True:
+            updated = self.rerender(batch_size)
+            self.stdout.write('Re-rendered {0} instance(s).'.format(updated))
+
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,204 @@
+"""
+Contains custom manager and queryset classes.
+"""
+import collections
+import functools
+import operator
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+
+from taggit.models import GenericTaggedItemBase
+from wagtail.wagtailcore.models import Page
+from wagtail.wagtailcore.models import PageManager
+from wagtail.wagtailcore.models import PageQuerySet
+
+from .registry import get_taggable_page_models
+
+
+def fill_tag_names(pages):
+    """
+    Sets the "tag_names" property of specified pages with one query per
+    tag through model.
+
+    :param pages: list of page instances.
+    """
+    through_models  = dict(get_taggable_page_models())
+    grouped         = collections.defaultdict(list)
+
+    for page in pages:
+        through = through_models.get(page.__class__)
+        if through is not None:
+            grouped[through].append(page)
+
+    for through, objs in grouped.items():
+        names = collections.defaultdict(list)
+
+        if issubclass(through, GenericTaggedItemBase):
+            rows = through.objects.filter(
+                content_type    = ContentType.objects.get_for_model(objs[0]),
+                object_id__in   = [obj.pk for obj in objs]
+            ).values_list('object_id', 'tag__name')
+        else:
+            rows = through.objects.filter(
+                content_object__in = [obj.pk for obj in objs]
+            ).values_list('content_object', 'tag__name')
+
+        for pk, name in rows:
+            names[pk].append(name.replace('-', ' '))
+
+        for obj in objs:
+            obj.__dict__['tag_names'] = names[obj.pk]
+
+def get_live_children(pages, fields=None):
+    """
+    Returns dictionary of live child pages (or specified field values)
+    keyed by parent path, loaded with a single query.
+
+    :param pages: list of page instances.
+    :param fields: optional list of fields to load instead of pages.
+    :rtype: dict.
+    """
+    children = collections.defaultdict(list)
+    if not pages:
+        return children
+
+    query = functools.reduce(operator.or_, [
+        Q(path__startswith=page.path, depth=page.depth + 1)
+        for page in pages
+    ])
+
+    qs = Page.objects.live().filter(query)
+    if fields is not None:
+        qs = qs.values_list('path', *fields)
+
+    for child in qs:
+        path = child[0] if fields is not None else child.path
+        children[path[:-Page.steplen]].append(child)
+
+    return children
+
+def fill_live_children(pages):
+    """
+    Sets the "live_children" property of specified pages with a single
+    query. Each value is a queryset whose results are already loaded.
+
+    :param pages: list of page instances.
+    """
+    children = get_live_children(pages)
+
+    for page in pages:
+        objs    = children[page.path]
+        qs      = Page.objects.live().filter(pk__in=[obj.pk for obj in objs])
+
+        qs._result_cache        = objs
+        qs._prefetch_done       = True
+        page.__dict__['live_children'] = qs
+
+def fill_live_child_counts(pages):
+    """
+    Sets the "live_child_count" property of specified pages with a single
+    query.
+
+    :param pages: list of page instances.
+    """
+    children = get_live_children(pages, fields=[])
+
+    for page in pages:
+        page.__dict__['live_child_count'] = len(children[page.path])
+
+class BasePageQuerySet(PageQuerySet):
+    """
+    Page queryset that can fill BasePageMixin properties for all of its
+    pages with a constant number of queries.
+    """
+    def __init__(self, *args, **kwargs):
+        super(BasePageQuerySet, self).__init__(*args, **kwargs)
+        self._fill_functions = []
+
+    def _clone(self, *args, **kwargs):
+        clone = super(BasePageQuerySet, self)._clone(*args, **kwargs)
+        clone._fill_functions = list(self._fill_functions)
+        return clone
+
+    def _fetch_all(self):
+        fill = self._result_cache is None
+        super(BasePageQuerySet, self)._fetch_all()
+
+        if fill and self._fill_functions:
+            pages = [obj for obj in self._result_cache if isinstance(obj, Page)]
+            for fn in self._fill_functions:
+                fn(pages)
+
+    def _with(self, fn):
+        """
+        Returns copy of this queryset that calls specified function with
+        the loaded pages.
+
+        :param fn: the function.
+        :rtype: BasePageQuerySet.
+        """
+        clone = self._clone()
+        if fn not in clone._fill_functions:
+            clone._fill_functions.append(fn)
+        return clone
+
+    def with_tag_names(self):
+        """
+        Returns queryset that fills "tag_names" of each page.
+
+        :rtype: BasePageQuerySet.
+        """
+        return self._with(fill_tag_names)
+
+    def with_live_children(self):
+        """
+        Returns queryset that fills "live_children" of each page.
+
+        :rtype: BasePageQuerySet.
+        """
+        return self._with(fill_live_children)
+
+    def with_live_child_counts(self):
+        """
+        Returns queryset that fills "live_child_count" of each page.
+
+        :rtype: BasePageQuerySet.
+        """
+        return self._with(fill_live_child_counts)
+
+class BasePageManager(PageManager):
+    """
+    Custom manager class for BasePageMixin pages.
+    """
+    def get_queryset(self):
+        """
+        Returns queryset of pages.
+
+        :rtype: BasePageQuerySet.
+        """
+        return BasePageQuerySet(self.model, using=self._db).order_by('path')
+
+    def with_tag_names(self):
+        """
+        Returns queryset that fills "tag_names" of each page.
+
+        :rtype: BasePageQuerySet.
+        """
+        return self.get_queryset().with_tag_names()
+
+    def with_live_children(self):
+        """
+        Returns queryset that fills "live_children" of each page.
+
+        :rtype: BasePageQuerySet.
+        """
+        return self.get_queryset().with_live_children()
+
+    def with_live_child_counts(self):
+        """
+        Returns queryset that fills "live_child_count" of each page.
+
+        :rtype: BasePageQuerySet.
+        """
+        return self.get_queryset().with_live_child_counts()
@@ -0,0 +1,30 @@
+"""
+Contains middleware classes.
+"""
+from .rich_text import activate_identity_map
+from .rich_text import deactivate_identity_map
+
+
+class RichTextIdentityMapMiddleware(object):
+    """
+    Shares loaded rich-text link targets across every rich-text field
+    rendered during a request, so each target is loaded at most once.
+    """
+    def process_request(self, request):
+        """
+        Activates the identity map.
+
+        :param request: the request instance.
+        """
+        activate_identity_map()
+
+    def process_response(self, request, response):
+        """
+        Deactivates the identity map.
+
+        :param request: the request instance.
+        :param response: the response instance.
+        :rtype: django.http.HttpResponse.
+        """
+        deactivate_identity_map()
+        return response
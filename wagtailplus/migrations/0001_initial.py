@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RichTextReference',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('object_id', models.IntegerField(verbose_name='Object ID', db_index=True)),
+                ('field_name', models.CharField(max_length=255, verbose_name='Field Name')),
+                ('link_type', models.CharField(max_length=50, verbose_name='Link Type')),
+                ('target_id', models.IntegerField(verbose_name='Target ID')),
+                ('content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'Rich-Text Reference',
+                'verbose_name_plural': 'Rich-Text References',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='richtextreference',
+            index_together=set([('link_type', 'target_id')]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailplus', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='richtextreference',
+            name='is_stale',
+            field=models.BooleanField(default=False, db_index=True, verbose_name='Stale'),
+        ),
+    ]
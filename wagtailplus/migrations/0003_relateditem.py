@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('wagtailplus', '0002_richtextreference_is_stale'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedItem',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('source_id', models.IntegerField(verbose_name='Source ID')),
+                ('related_id', models.IntegerField(verbose_name='Related ID')),
+                ('score', models.IntegerField(default=0, verbose_name='Score')),
+                ('related_content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+                ('source_content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'Related Item',
+                'verbose_name_plural': 'Related Items',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='relateditem',
+            unique_together=set([('source_content_type', 'source_id', 'related_content_type', 'related_id')]),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailplus', '0003_relateditem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='relateditem',
+            name='method',
+            field=models.CharField(default='count', max_length=20, verbose_name='Method', choices=[('count', 'Shared tags'), ('tfidf', 'TF-IDF cosine similarity'), ('jaccard', 'Jaccard similarity')]),
+        ),
+        migrations.AlterField(
+            model_name='relateditem',
+            name='score',
+            field=models.FloatField(default=0, verbose_name='Score'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='relateditem',
+            unique_together=set([('source_content_type', 'source_id', 'method', 'related_content_type', 'related_id')]),
+        ),
+    ]
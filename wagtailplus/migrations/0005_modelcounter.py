@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('wagtailplus', '0004_relateditem_method'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelCounter',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('count', models.BigIntegerField(default=0, verbose_name='Count')),
+                ('content_type', models.OneToOneField(related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'Model Counter',
+                'verbose_name_plural': 'Model Counters',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('taggit', '0001_initial'),
+        ('wagtailplus', '0005_modelcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCount',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+                ('content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+                ('tag', models.ForeignKey(related_name='+', to='taggit.Tag')),
+            ],
+            options={
+                'verbose_name': 'Tag Count',
+                'verbose_name_plural': 'Tag Counts',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='tagcount',
+            unique_together=set([('content_type', 'tag')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='tagcount',
+            index_together=set([('content_type', 'count')]),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('wagtailplus', '0006_tagcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexOperation',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('object_id', models.PositiveIntegerField(verbose_name='Object ID')),
+                ('backend', models.CharField(max_length=255, verbose_name='Backend')),
+                ('action', models.CharField(max_length=10, verbose_name='Action', choices=[('add', 'Add'), ('delete', 'Delete')])),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Created')),
+                ('content_type', models.ForeignKey(related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'ordering': ('pk',),
+                'verbose_name': 'Search Index Operation',
+                'verbose_name_plural': 'Search Index Operations',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailplus', '0007_searchindexoperation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchindexoperation',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Attempts'),
+        ),
+        migrations.AddField(
+            model_name='searchindexoperation',
+            name='last_error',
+            field=models.TextField(verbose_name='Last Error', blank=True),
+        ),
+    ]
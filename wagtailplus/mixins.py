@@ -2,7 +2,9 @@
 Contains mixin classes.
 """
 import collections
+import heapq
 
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.utils.functional import cached_property
 
@@ -10,6 +12,11 @@ from taggit.models import TaggedItem
 from wagtail.wagtailadmin.taggable import TagSearchable
 from wagtail.wagtailcore.models import Page
 
+from .app_settings import RELATED_ITEMS_MATERIALIZED
+from .generic import load_generic_objects
+from .managers import BasePageManager
+from .registry import get_taggable_page_models
+
 
 class CustomTemplateMixin(models.Model):
     """
@@ -37,59 +44,176 @@ class RelatedItemsMixin(object):
     """
     Allows access to other instances (pages and generic) that
     are related by tags.
+
+    Set "related_scoring" to "tfidf" or "jaccard" to rank related items
+    by tag similarity instead of the number of shared tags; similarity
+    scores are read from the RelatedItem table, which is filled by the
+    compute_tag_similarity command.
     """
-    def _get_related_score(self, item):
+    related_scoring = 'count'
+
+    def _uses_related_table(self):
         """
-        Returns the number of tags that specified item instance
-        has in common with this instance.
+        Returns True if related items are read from the RelatedItem table.
 
-        :param item: the related item instance.
-        :rtype: int.
+        :rtype: bool.
         """
-        return len(list(set(self.tags.all()).intersection(item.tags.all())))
+        return RELATED_ITEMS_MATERIALIZED or self.related_scoring != 'count'
 
-    def _get_pages(self, tag):
+    def _get_pages(self, tag_ids):
         """
-        Returns a set of unique pages for specified tag.
+        Returns a list of live pages sharing any of specified tags, each
+        with a "related_score" attribute set to the number of shared tags.
+        Uses one aggregated query per page model.
 
-        :param: tag object.
-        :rtype: set.
+        :param tag_ids: list of tag IDs.
+        :rtype: list.
         """
         related = []
         exclude = [self.pk]
 
-        for child in self.get_children().all():
-            exclude.append(child.pk)
-
-        for model in models.get_models():
-            # Is model derived from Page class?
-            derived = issubclass(model, Page) and model != Page
+        exclude += list(self.get_children().values_list('pk', flat=True))
 
-            # Does model have a "tags" attribute?
-            if derived and hasattr(model, 'tags'):
-                mgr = model.objects.live()
+        for model, through in get_taggable_page_models():
+            qs = model.objects.live().filter(
+                tags__in = tag_ids
+            ).exclude(
+                pk__in = exclude
+            ).annotate(
+                related_score = models.Count('tags', distinct=True)
+            )
 
-                for item in mgr.filter(tags__in=[tag]).exclude(pk__in=exclude):
-                    item.related_score  = self._get_related_score(item)
-                    related.append(item)
+            related += list(qs)
 
-        return set(related)
+        return related
 
-    def _get_generic_items(self, tag):
+    def _get_generic_items(self, tag_ids):
         """
-        Returns a set of unique generic items for specified tag.
+        Returns a list of generic items sharing any of specified tags,
+        each with a "related_score" attribute set to the number of shared
+        tags. Scores are computed with a single aggregated query, and
+        items are then loaded in bulk per content type.
 
-        :param: tag object.
-        :rtype: set.
+        :param tag_ids: list of tag IDs.
+        :rtype: list.
         """
         related = []
+        scores  = dict(
+            ((score[1], score[2]), score[0])
+            for score in self._get_generic_scores(tag_ids)
+        )
 
-        for generic in TaggedItem.objects.filter(tag__in=[tag]):
-            item = generic.content_object
-            item.related_score = self._get_related_score(item)
+        for key, item in load_generic_objects(scores).items():
+            item.related_score = scores[key]
             related.append(item)
 
-        return set(related)
+        return related
+
+    def _get_page_scores(self, tag_ids, types=None):
+        """
+        Returns a list of (score, content type ID, ID) tuples for live
+        pages sharing any of specified tags, without loading the pages.
+
+        :param tag_ids: list of tag IDs.
+        :param types: optional tuple of model classes to include.
+        :rtype: list.
+        """
+        scores  = []
+        exclude = [self.pk]
+
+        exclude += list(self.get_children().values_list('pk', flat=True))
+
+        for model, through in get_taggable_page_models():
+            if types is not None and not issubclass(model, types):
+                continue
+
+            content_type = ContentType.objects.get_for_model(model)
+
+            rows = model.objects.live().filter(
+                tags__in = tag_ids
+            ).exclude(
+                pk__in = exclude
+            ).values_list(
+                'pk'
+            ).annotate(
+                related_score = models.Count('tags', distinct=True)
+            ).order_by()
+
+            for pk, score in rows:
+                scores.append((score, content_type.id, pk))
+
+        return scores
+
+    def _get_generic_scores(self, tag_ids, types=None):
+        """
+        Returns a list of (score, content type ID, ID) tuples for generic
+        items sharing any of specified tags, without loading the items.
+
+        :param tag_ids: list of tag IDs.
+        :param types: optional tuple of model classes to include.
+        :rtype: list.
+        """
+        from .models.related_item import get_content_type_ids
+
+        rows = TaggedItem.objects.filter(
+            tag__in = tag_ids
+        ).values_list(
+            'content_type',
+            'object_id'
+        ).annotate(
+            related_score = models.Count('tag', distinct=True)
+        ).order_by()
+
+        if types is not None:
+            rows = rows.filter(content_type__in=get_content_type_ids(types))
+
+        return [
+            (score, content_type_id, object_id)
+            for content_type_id, object_id, score in rows
+        ]
+
+    def related_top(self, k, types=None):
+        """
+        Returns a list of at most k related items with the highest
+        related scores, highest first. Only the returned items are
+        loaded.
+
+        :param k: the maximum number of items.
+        :param types: optional iterable of model classes to include.
+        :rtype: list.
+        """
+        from .models import RelatedItem
+
+        if types is not None:
+            types = tuple(types)
+
+        if self._uses_related_table():
+            return RelatedItem.objects.get_top_related_items(
+                self,
+                k,
+                types,
+                self.related_scoring
+            )
+
+        tag_ids = [tag.pk for tag in self.tags.all()]
+        if not tag_ids:
+            return []
+
+        candidates  = self._get_generic_scores(tag_ids, types)
+        candidates  += self._get_page_scores(tag_ids, types)
+        top         = heapq.nlargest(k, candidates)
+
+        scores = collections.defaultdict(dict)
+        for score, content_type_id, pk in top:
+            scores[content_type_id][pk] = score
+
+        items = RelatedItem.objects.load_related_items(self, scores)
+        order = dict(((row[1], row[2]), i) for i, row in enumerate(top))
+
+        return sorted(items, key=lambda x: order[(
+            ContentType.objects.get_for_model(x.__class__).id,
+            x.pk
+        )])
 
     @property
     def related_by_type(self):
@@ -124,14 +248,22 @@ class RelatedItemsMixin(object):
 
         :rtype: list.
         """
-        related = []
+        if self._uses_related_table():
+            from .models import RelatedItem
+
+            related = RelatedItem.objects.get_related_items(
+                self,
+                self.related_scoring
+            )
+            return sorted(related, key=lambda x: str(x))
 
-        for tag in self.tags.all():
-            # Add Generic items.
-            related += self._get_generic_items(tag)
+        tag_ids = [tag.pk for tag in self.tags.all()]
+        if not tag_ids:
+            return []
 
-            # Add pages.
-            related += self._get_pages(tag)
+        # Add generic items and pages.
+        related = self._get_generic_items(tag_ids)
+        related += self._get_pages(tag_ids)
 
         # Sort items by name.
         return sorted(set(related), key=lambda x: str(x))
@@ -140,7 +272,13 @@ class BasePageMixin(CustomTemplateMixin, RelatedItemsMixin, TagSearchable):
     """
     Base mixin class for website pages (CustomTemplateMixin,
     RelatedItemsMixin, and TagSearchable).
+
+    The "live_children", "live_child_count" and "tag_names" properties
+    of a whole listing can be filled in bulk with the queryset methods
+    with_live_children(), with_live_child_counts() and with_tag_names().
     """
+    objects = BasePageManager()
+
     class Meta(object):
         abstract = True
 
@@ -155,6 +293,15 @@ class BasePageMixin(CustomTemplateMixin, RelatedItemsMixin, TagSearchable):
 
         return Page.objects.live().filter(pk__in=child_pks)
 
+    @cached_property
+    def live_child_count(self):
+        """
+        Returns number of live child instances.
+
+        :rtype: int.
+        """
+        return self.live_children.count()
+
     @cached_property
     def tag_names(self):
         """
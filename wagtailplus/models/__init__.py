@@ -0,0 +1,8 @@
+"""
+Contains model class definitions.
+"""
+from .model_counter import ModelCounter
+from .related_item import RelatedItem
+from .rich_text_reference import RichTextReference
+from .search_index_operation import SearchIndexOperation
+from .tag_count import TagCount
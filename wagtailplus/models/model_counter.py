@@ -0,0 +1,81 @@
+"""
+Contains model counter class definitions.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError
+from django.db import models
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
+
+
+class ModelCounterManager(models.Manager):
+    """
+    Custom model counter manager.
+    """
+    def get_count(self, model):
+        """
+        Returns stored number of instances of specified model, counting
+        them once if no counter exists yet.
+
+        :param model: the model class.
+        :rtype: int.
+        """
+        content_type    = ContentType.objects.get_for_model(model)
+        counts          = list(self.filter(
+            content_type = content_type
+        ).values_list('count', flat=True))
+
+        if counts:
+            return counts[0]
+
+        return self.reset(model)
+
+    def reset(self, model):
+        """
+        Stores and returns the exact number of instances of specified
+        model.
+
+        :param model: the model class.
+        :rtype: int.
+        """
+        content_type = ContentType.objects.get_for_model(model)
+
+        with transaction.atomic():
+            count   = model._default_manager.count()
+            updated = self.filter(content_type=content_type).update(count=count)
+
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        self.create(content_type=content_type, count=count)
+                except IntegrityError:
+                    # Created concurrently; keep the other count.
+                    pass
+
+        return count
+
+    def adjust(self, model, delta):
+        """
+        Adds specified delta to the counter of specified model, if it
+        exists.
+
+        :param model: the model class.
+        :param delta: the change in the number of instances.
+        """
+        self.filter(
+            content_type = ContentType.objects.get_for_model(model)
+        ).update(count=models.F('count') + delta)
+
+class ModelCounter(models.Model):
+    """
+    Stores the number of instances of a model, for models whose count
+    strategy is "counter".
+    """
+    content_type    = models.OneToOneField(ContentType, related_name='+')
+    count           = models.BigIntegerField(_(u'Count'), default=0)
+    objects         = ModelCounterManager()
+
+    class Meta(object):
+        app_label           = 'wagtailplus'
+        verbose_name        = _(u'Model Counter')
+        verbose_name_plural = _(u'Model Counters')
@@ -0,0 +1,679 @@
+"""
+Contains materialized related item class definitions.
+"""
+import collections
+
+from django.apps import apps
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.db import models
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
+
+from wagtailplus.registry import get_page_through_models
+
+
+# Scoring methods: the number of shared tags, maintained by signals, and
+# tag similarity scores, computed in batch.
+METHOD_COUNT    = 'count'
+METHOD_TFIDF    = 'tfidf'
+METHOD_JACCARD  = 'jaccard'
+
+SCORING_METHODS = (
+    (METHOD_COUNT,      _(u'Shared tags')),
+    (METHOD_TFIDF,      _(u'TF-IDF cosine similarity')),
+    (METHOD_JACCARD,    _(u'Jaccard similarity')),
+)
+
+def get_tagged_model(model):
+    """
+    Returns the model that tags of specified model's instances are
+    recorded against: the page model declaring the "tags" through model,
+    or specified model itself for generic items.
+
+    :param model: the model class.
+    :rtype: django.db.models.Model.
+    """
+    through_models = get_page_through_models()
+
+    for base in model.__mro__:
+        if base in through_models:
+            return base
+
+    return model
+
+def get_tagged_object(tagged_item):
+    """
+    Returns (content type ID, object ID) tuple for specified through
+    model instance, or None if it is not tracked.
+
+    :param tagged_item: the through model instance.
+    :rtype: tuple.
+    """
+    from taggit.models import TaggedItem
+
+    if isinstance(tagged_item, TaggedItem):
+        return tagged_item.content_type_id, tagged_item.object_id
+
+    for model, through in get_page_through_models().items():
+        if isinstance(tagged_item, through):
+            content_type = ContentType.objects.get_for_model(model)
+            return content_type.id, tagged_item.content_object_id
+
+    return None
+
+def get_content_type_ids(types):
+    """
+    Returns set of IDs of the content types of specified models and
+    their subclasses.
+
+    :param types: iterable of model classes.
+    :rtype: set.
+    """
+    types = tuple(types)
+
+    return set(
+        ContentType.objects.get_for_model(model).id
+        for model in apps.get_models()
+        if issubclass(model, types)
+    )
+
+def get_score(method, score):
+    """
+    Returns specified stored score as an integer for shared tag counts,
+    or as a float for similarity scores.
+
+    :param method: the scoring method.
+    :param score: the stored score.
+    :rtype: int or float.
+    """
+    return int(score) if method == METHOD_COUNT else score
+
+def is_related_source(content_type_id):
+    """
+    Returns True if instances of specified content type keep their own
+    related items.
+
+    :param content_type_id: the content type ID.
+    :rtype: bool.
+    """
+    from wagtailplus.mixins import RelatedItemsMixin
+
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+
+    return model is not None and issubclass(model, RelatedItemsMixin)
+
+class RelatedItemManager(models.Manager):
+    """
+    Custom related item model manager.
+    """
+    def get_tagged_objects(self, tag_ids):
+        """
+        Returns dictionary of shared tag counts for objects with any of
+        specified tags, keyed by (content type ID, object ID).
+
+        :param tag_ids: list of tag IDs.
+        :rtype: dict.
+        """
+        from taggit.models import TaggedItem
+
+        scores = {}
+
+        rows = TaggedItem.objects.filter(
+            tag__in = tag_ids
+        ).values_list(
+            'content_type',
+            'object_id'
+        ).annotate(
+            score = models.Count('tag', distinct=True)
+        ).order_by()
+
+        for content_type_id, object_id, score in rows:
+            scores[(content_type_id, object_id)] = score
+
+        for model, through in get_page_through_models().items():
+            content_type = ContentType.objects.get_for_model(model)
+
+            rows = through.objects.filter(
+                tag__in = tag_ids
+            ).values_list(
+                'content_object'
+            ).annotate(
+                score = models.Count('tag', distinct=True)
+            ).order_by()
+
+            for object_id, score in rows:
+                scores[(content_type.id, object_id)] = score
+
+        return scores
+
+    def build_for_instance(self, instance):
+        """
+        Returns list of unsaved related items for specified instance.
+
+        :param instance: the model instance.
+        :rtype: list.
+        """
+        tag_ids         = [tag.pk for tag in instance.tags.all()]
+        content_type    = ContentType.objects.get_for_model(
+            get_tagged_model(instance.__class__)
+        )
+
+        if not tag_ids:
+            return []
+
+        scores = self.get_tagged_objects(tag_ids)
+        scores.pop((content_type.id, instance.pk), None)
+
+        return [
+            self.model(
+                source_content_type_id  = content_type.id,
+                source_id               = instance.pk,
+                related_content_type_id = related_content_type_id,
+                related_id              = related_id,
+                score                   = score
+            )
+            for (related_content_type_id, related_id), score in scores.items()
+        ]
+
+    def update_for_instances(self, instances):
+        """
+        Replaces stored related items for specified instances.
+
+        :param instances: list of model instances of the same class.
+        """
+        if not instances:
+            return
+
+        content_type    = ContentType.objects.get_for_model(
+            get_tagged_model(instances[0].__class__)
+        )
+        related_items   = []
+
+        for instance in instances:
+            related_items += self.build_for_instance(instance)
+
+        with transaction.atomic():
+            self.filter(
+                source_content_type = content_type,
+                source_id__in       = [instance.pk for instance in instances],
+                method              = METHOD_COUNT
+            ).delete()
+            self.bulk_create(related_items)
+
+    def replace_scores(self, method, sources, scores):
+        """
+        Replaces stored related items of specified scoring method for
+        specified source objects.
+
+        :param method: the scoring method.
+        :param sources: list of (content type ID, object ID) tuples.
+        :param scores: list of (source, related, score) tuples, where
+            source and related are (content type ID, object ID) tuples.
+        """
+        grouped = collections.defaultdict(list)
+        for content_type_id, object_id in sources:
+            grouped[content_type_id].append(object_id)
+
+        with transaction.atomic():
+            for content_type_id, object_ids in grouped.items():
+                self.filter(
+                    source_content_type_id  = content_type_id,
+                    source_id__in           = object_ids,
+                    method                  = method
+                ).delete()
+
+            self.bulk_create([
+                self.model(
+                    source_content_type_id  = source[0],
+                    source_id               = source[1],
+                    related_content_type_id = related[0],
+                    related_id              = related[1],
+                    method                  = method,
+                    score                   = score
+                )
+                for source, related, score in scores
+            ])
+
+    def update_for_instance(self, instance):
+        """
+        Replaces stored related items for specified instance.
+
+        :param instance: the model instance.
+        """
+        self.update_for_instances([instance])
+
+    def adjust_for_tagged_item(self, tagged_item, delta):
+        """
+        Adds specified delta to the score of every pair formed by the
+        object of specified through model instance and the other objects
+        sharing its tag, in both directions.
+
+        :param tagged_item: the saved or deleted through model instance.
+        :param delta: 1 for an added tag, -1 for a removed one.
+        """
+        tagged_object = get_tagged_object(tagged_item)
+        if tagged_object is None:
+            return
+
+        others = self.get_tagged_objects([tagged_item.tag_id])
+        others.pop(tagged_object, None)
+        if not others:
+            return
+
+        pairs = []
+        if is_related_source(tagged_object[0]):
+            pairs += [(tagged_object, other) for other in others]
+
+        sources = set(other[0] for other in others)
+        sources = set(pk for pk in sources if is_related_source(pk))
+        pairs   += [
+            (other, tagged_object) for other in others
+            if other[0] in sources
+        ]
+
+        with transaction.atomic():
+            self.adjust_pairs(pairs, delta)
+
+    def get_tagged_querysets(self, tag_id):
+        """
+        Returns list of (content type ID, queryset, field name) tuples for
+        the objects with specified tag, one per content type, where each
+        queryset selects through model instances and the field holds the
+        object ID.
+
+        :param tag_id: the tag ID.
+        :rtype: list.
+        """
+        from taggit.models import TaggedItem
+
+        tagged              = []
+        content_type_ids    = TaggedItem.objects.filter(
+            tag_id = tag_id
+        ).order_by().values_list('content_type', flat=True).distinct()
+
+        for content_type_id in content_type_ids:
+            tagged.append((
+                content_type_id,
+                TaggedItem.objects.filter(
+                    tag_id          = tag_id,
+                    content_type_id = content_type_id
+                ).order_by(),
+                'object_id'
+            ))
+
+        for model, through in get_page_through_models().items():
+            tagged.append((
+                ContentType.objects.get_for_model(model).id,
+                through.objects.filter(tag_id=tag_id).order_by(),
+                'content_object'
+            ))
+
+        return tagged
+
+    def adjust_for_tag(self, tag_id, content_type_id, object_ids, delta):
+        """
+        Adds specified delta to the score of every pair formed by specified
+        objects, whose tag was added or removed in bulk, and the other
+        objects with the tag, in both directions.
+
+        Pairs are selected by joining the through tables in the database,
+        so they are never built in memory; call this while the objects are
+        tagged, after adding the tag or before removing it.
+
+        :param tag_id: the tag ID.
+        :param content_type_id: the content type ID of the objects.
+        :param object_ids: list of object IDs.
+        :param delta: 1 for an added tag, -1 for a removed one.
+        """
+        tagged  = self.get_tagged_querysets(tag_id)
+        changed = [
+            (qs.filter(**{'{0}__in'.format(field): object_ids}), field)
+            for ct_id, qs, field in tagged
+            if ct_id == content_type_id
+        ]
+        pairs   = []
+
+        if not changed:
+            return
+
+        changed_qs, changed_field = changed[0]
+
+        # Changed objects to every tagged object, including each other.
+        if is_related_source(content_type_id):
+            for ct_id, qs, field in tagged:
+                pairs.append((
+                    (content_type_id, changed_qs, changed_field),
+                    (ct_id, qs, field)
+                ))
+
+        # Other tagged objects to the changed objects.
+        for ct_id, qs, field in tagged:
+            if not is_related_source(ct_id):
+                continue
+
+            if ct_id == content_type_id:
+                qs = qs.exclude(**{'{0}__in'.format(field): object_ids})
+
+            pairs.append((
+                (ct_id, qs, field),
+                (content_type_id, changed_qs, changed_field)
+            ))
+
+        with transaction.atomic():
+            for source, related in pairs:
+                self.adjust_tagged_pairs(source, related, delta)
+
+    def adjust_tagged_pairs(self, source, related, delta):
+        """
+        Adds specified delta to the score of every pair of specified
+        source and related objects, creating missing pairs with an
+        INSERT ... SELECT and deleting pairs that no longer share any tag.
+
+        :param source: tuple of content type ID, through model queryset
+            and object ID field name.
+        :param related: tuple of content type ID, through model queryset
+            and object ID field name.
+        :param delta: the score change.
+        """
+        source_ct, source_qs, source_field      = source
+        related_ct, related_qs, related_field   = related
+        source_qs                               = source_qs.values_list(source_field, flat=True)
+        related_qs                              = related_qs.values_list(related_field, flat=True)
+
+        qs = self.filter(
+            source_content_type_id  = source_ct,
+            source_id__in           = source_qs,
+            method                  = METHOD_COUNT,
+            related_content_type_id = related_ct,
+            related_id__in          = related_qs
+        )
+        qs.update(score=models.F('score') + delta)
+
+        if delta < 0:
+            qs = qs.filter(score__lte=0)
+            qs._raw_delete(qs.db)
+            return
+
+        connection  = connections[self.db]
+        qn          = connection.ops.quote_name
+        opts        = self.model._meta
+        columns     = dict(
+            (name, qn(opts.get_field(name).column))
+            for name in ('source_content_type', 'source_id', 'method', 'related_content_type', 'related_id', 'score')
+        )
+
+        source_sql, source_params   = source_qs.query.sql_with_params()
+        related_sql, related_params = related_qs.query.sql_with_params()
+        source_column               = qn(source_qs.model._meta.get_field(source_field).column)
+        related_column              = qn(related_qs.model._meta.get_field(related_field).column)
+
+        sql = (
+            'INSERT INTO {table} ({source_content_type}, {source_id}, {method}, '
+            '{related_content_type}, {related_id}, {score}) '
+            'SELECT %s, s.{s}, %s, %s, r.{r}, %s FROM ({source_sql}) s, ({related_sql}) r '
+            'WHERE NOT EXISTS (SELECT 1 FROM {table} e '
+            'WHERE e.{source_content_type} = %s AND e.{source_id} = s.{s} '
+            'AND e.{method} = %s AND e.{related_content_type} = %s '
+            'AND e.{related_id} = r.{r})'
+        )
+
+        # Objects are not related to themselves.
+        if source_ct == related_ct:
+            sql += ' AND s.{s} <> r.{r}'
+
+        sql = sql.format(
+            table       = qn(opts.db_table),
+            s           = source_column,
+            r           = related_column,
+            source_sql  = source_sql,
+            related_sql = related_sql,
+            **columns
+        )
+        params = (
+            [source_ct, METHOD_COUNT, related_ct, delta] +
+            list(source_params) +
+            list(related_params) +
+            [source_ct, METHOD_COUNT, related_ct]
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def adjust_pairs(self, pairs, delta):
+        """
+        Adds specified delta to the score of specified pairs, creating
+        missing pairs and deleting pairs that no longer share any tag.
+
+        :param pairs: list of ((content type ID, object ID),
+            (content type ID, object ID)) source and related tuples.
+        :param delta: the score change.
+        """
+        grouped = collections.defaultdict(list)
+        for source, related in pairs:
+            grouped[(source, related[0])].append(related[1])
+
+        for (source, related_content_type_id), related_ids in grouped.items():
+            qs = self.filter(
+                source_content_type_id  = source[0],
+                source_id               = source[1],
+                method                  = METHOD_COUNT,
+                related_content_type_id = related_content_type_id,
+                related_id__in          = related_ids
+            )
+            qs.update(score=models.F('score') + delta)
+
+            if delta > 0:
+                existing = set(qs.values_list('related_id', flat=True))
+                self.bulk_create([
+                    self.model(
+                        source_content_type_id  = source[0],
+                        source_id               = source[1],
+                        related_content_type_id = related_content_type_id,
+                        related_id              = related_id,
+                        score                   = delta
+                    )
+                    for related_id in related_ids
+                    if related_id not in existing
+                ])
+            else:
+                qs.filter(score__lte=0).delete()
+
+    def delete_for_objects(self, model, object_ids):
+        """
+        Deletes stored related items of every scoring method from and to
+        instances of specified model with specified primary keys, without
+        fetching them.
+
+        :param model: the model class.
+        :param object_ids: list of primary keys.
+        """
+        content_type = ContentType.objects.get_for_model(get_tagged_model(model))
+
+        for prefix in ('source', 'related'):
+            qs = self.filter(**{
+                '{0}_content_type'.format(prefix):  content_type,
+                '{0}_id__in'.format(prefix):        object_ids
+            })
+            qs._raw_delete(qs.db)
+
+    def get_related_items(self, instance, method=METHOD_COUNT):
+        """
+        Returns list of stored related items for specified instance, each
+        with a "related_score" attribute. Only live pages are returned,
+        excluding the instance's children.
+
+        :param instance: the model instance.
+        :param method: the scoring method.
+        :rtype: list.
+        """
+        content_type = ContentType.objects.get_for_model(
+            get_tagged_model(instance.__class__)
+        )
+
+        rows = self.filter(
+            source_content_type = content_type,
+            source_id           = instance.pk,
+            method              = method
+        ).values_list('related_content_type', 'related_id', 'score')
+
+        scores = collections.defaultdict(dict)
+        for related_content_type_id, related_id, score in rows:
+            scores[related_content_type_id][related_id] = get_score(method, score)
+
+        return self.load_related_items(instance, scores)
+
+    def get_top_related_items(self, instance, k, types=None, method=METHOD_COUNT):
+        """
+        Returns list of at most k stored related items for specified
+        instance with the highest scores, highest first. Rows are read in
+        score order and only as many items as needed are loaded.
+
+        :param instance: the model instance.
+        :param k: the maximum number of items.
+        :param types: optional iterable of model classes to include.
+        :param method: the scoring method.
+        :rtype: list.
+        """
+        content_type = ContentType.objects.get_for_model(
+            get_tagged_model(instance.__class__)
+        )
+
+        qs = self.filter(
+            source_content_type = content_type,
+            source_id           = instance.pk,
+            method              = method
+        ).order_by(
+            '-score',
+            '-related_content_type',
+            '-related_id'
+        ).values_list('related_content_type', 'related_id', 'score')
+
+        if types is not None:
+            qs = qs.filter(related_content_type__in=get_content_type_ids(types))
+
+        related = []
+        offset  = 0
+
+        # Pages that are not live (or are children) are skipped when
+        # loaded, so keep reading until there are enough items.
+        while len(related) < k:
+            rows = list(qs[offset:offset + k])
+            if not rows:
+                break
+
+            offset += len(rows)
+            scores = collections.defaultdict(dict)
+            for related_content_type_id, related_id, score in rows:
+                scores[related_content_type_id][related_id] = get_score(method, score)
+
+            order   = dict(((row[0], row[1]), i) for i, row in enumerate(rows))
+            items   = self.load_related_items(instance, scores)
+            items.sort(key=lambda x: order[(
+                ContentType.objects.get_for_model(x.__class__).id,
+                x.pk
+            )])
+
+            related += items
+
+        return related[:k]
+
+    def load_related_items(self, instance, scores):
+        """
+        Returns list of related items for specified scores, loaded with
+        one query per content type.
+
+        :param instance: the source instance.
+        :param scores: dictionary of {object ID: score} dictionaries keyed
+            by content type ID.
+        :rtype: list.
+        """
+        from wagtail.wagtailcore.models import Page
+        from wagtailplus.generic import load_generic_objects
+
+        related     = []
+        generic     = {}
+        children    = None
+
+        for content_type_id, object_scores in scores.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+
+            # Skip stale content types.
+            if model is None:
+                continue
+
+            if not issubclass(model, Page):
+                for object_id, score in object_scores.items():
+                    generic[(content_type_id, object_id)] = score
+                continue
+
+            if children is None and isinstance(instance, Page):
+                children = list(
+                    instance.get_children().values_list('pk', flat=True)
+                )
+
+            qs = model.objects.live().exclude(pk__in=children or [])
+
+            for item in qs.filter(pk__in=list(object_scores)):
+                item.related_score = object_scores[item.pk]
+                related.append(item)
+
+        for key, item in load_generic_objects(generic).items():
+            item.related_score = generic[key]
+            related.append(item)
+
+        return related
+
+class RelatedItem(models.Model):
+    """
+    Stores the score of another tagged object related to a
+    RelatedItemsMixin instance: the number of shared tags, or a tag
+    similarity score, depending on the scoring method.
+    """
+    source_content_type     = models.ForeignKey(ContentType, related_name='+')
+    source_id               = models.IntegerField(_(u'Source ID'))
+    source                  = GenericForeignKey('source_content_type', 'source_id')
+    related_content_type    = models.ForeignKey(ContentType, related_name='+')
+    related_id              = models.IntegerField(_(u'Related ID'))
+    related                 = GenericForeignKey('related_content_type', 'related_id')
+    method                  = models.CharField(_(u'Method'), max_length=20, choices=SCORING_METHODS, default=METHOD_COUNT)
+    score                   = models.FloatField(_(u'Score'), default=0)
+    objects                 = RelatedItemManager()
+
+    class Meta(object):
+        app_label           = 'wagtailplus'
+        verbose_name        = _(u'Related Item')
+        verbose_name_plural = _(u'Related Items')
+        unique_together     = ((
+            'source_content_type',
+            'source_id',
+            'method',
+            'related_content_type',
+            'related_id'
+        ),)
+
+def add_related_items(sender, instance, **kwargs):
+    """
+    Updates related item scores when a tag is added to an object.
+
+    :param sender: the sending class.
+    :param instance: the saved through model instance.
+    """
+    from taggit.models import ItemBase
+
+    created = kwargs.get('created', False)
+    if created and not kwargs.get('raw', False) and isinstance(instance, ItemBase):
+        RelatedItem.objects.adjust_for_tagged_item(instance, 1)
+
+def remove_related_items(sender, instance, **kwargs):
+    """
+    Updates related item scores when a tag is removed from an object.
+
+    :param sender: the sending class.
+    :param instance: the deleted through model instance.
+    """
+    from taggit.models import ItemBase
+
+    if isinstance(instance, ItemBase):
+        RelatedItem.objects.adjust_for_tagged_item(instance, -1)
@@ -0,0 +1,220 @@
+"""
+Contains rich-text reference class definitions.
+"""
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
+
+
+class RichTextReferenceManager(models.Manager):
+    """
+    Custom rich-text reference model manager.
+    """
+    def build_for_instance(self, instance):
+        """
+        Returns list of unsaved references for the flexible rich-text
+        fields of specified instance.
+
+        :param instance: the model instance.
+        :rtype: list.
+        """
+        from wagtailplus.fields import get_rich_text_fields
+        from wagtailplus.rich_text import LINK_HANDLERS
+        from wagtailplus.rich_text import get_link_ids
+
+        references      = []
+        content_type    = ContentType.objects.get_for_model(instance)
+
+        for field in get_rich_text_fields(instance.__class__):
+            html = getattr(instance, field.attname) or ''
+
+            for link_type, ids in get_link_ids(html).items():
+                model = LINK_HANDLERS[link_type].model
+                for target_id in ids:
+                    try:
+                        target_id = model._meta.pk.to_python(target_id)
+                    except ValidationError:
+                        continue
+
+                    references.append(self.model(
+                        content_type    = content_type,
+                        object_id       = instance.pk,
+                        field_name      = field.name,
+                        link_type       = link_type,
+                        target_id       = target_id
+                    ))
+
+        return references
+
+    def update_for_instances(self, instances):
+        """
+        Replaces stored references for specified instances.
+
+        :param instances: list of model instances of the same class.
+        """
+        if not instances:
+            return
+
+        content_type    = ContentType.objects.get_for_model(instances[0])
+        references      = []
+
+        for instance in instances:
+            references += self.build_for_instance(instance)
+
+        with transaction.atomic():
+            self.filter(
+                content_type    = content_type,
+                object_id__in   = [instance.pk for instance in instances]
+            ).delete()
+            self.bulk_create(references)
+
+    def update_for_instance(self, instance):
+        """
+        Replaces stored references for specified instance.
+
+        :param instance: the model instance.
+        """
+        self.update_for_instances([instance])
+
+    def delete_for_instance(self, instance):
+        """
+        Deletes stored references for specified instance.
+
+        :param instance: the model instance.
+        """
+        self.filter(
+            content_type    = ContentType.objects.get_for_model(instance),
+            object_id       = instance.pk
+        ).delete()
+
+    def delete_for_objects(self, model, object_ids):
+        """
+        Deletes stored references for instances of specified model with
+        specified primary keys, without fetching them.
+
+        :param model: the model class.
+        :param object_ids: list of primary keys.
+        """
+        qs = self.filter(
+            content_type    = ContentType.objects.get_for_model(model),
+            object_id__in   = object_ids
+        )
+        qs._raw_delete(qs.db)
+
+    def for_target(self, link_type, target_id):
+        """
+        Returns queryset of references to specified link target.
+
+        :param link_type: the link type (e.g. "link", "page" or "document").
+        :param target_id: the target primary key.
+        :rtype: django.db.models.query.QuerySet.
+        """
+        return self.filter(link_type=link_type, target_id=target_id)
+
+    def mark_stale_for_target(self, instance):
+        """
+        Flags references to specified link target as needing a re-render,
+        along with references to pages under a page whose URL path
+        changed (see wagtailplus.cache.record_page_url_change). A site
+        change flags every reference to a page.
+
+        :param instance: the Link, Page, Document or Site instance.
+        """
+        from wagtail.wagtailcore.models import Page
+        from wagtail.wagtailcore.models import Site
+        from wagtailplus.rich_text import LINK_HANDLERS
+
+        if isinstance(instance, Site):
+            self.filter(link_type__in=[
+                link_type for link_type, handler in LINK_HANDLERS.items()
+                if issubclass(handler.model, Page)
+            ]).update(is_stale=True)
+            return
+
+        for link_type, handler in LINK_HANDLERS.items():
+            if not isinstance(instance, handler.model):
+                continue
+
+            if getattr(instance, '_url_path_changed', False):
+                self.filter(
+                    link_type       = link_type,
+                    target_id__in   = Page.objects.filter(
+                        path__startswith = instance.path
+                    ).values('pk')
+                ).update(is_stale=True)
+            else:
+                self.for_target(link_type, instance.pk).update(is_stale=True)
+
+    def mark_stale_for_targets(self, model, target_ids):
+        """
+        Flags references to instances of specified model with specified
+        primary keys as needing a re-render.
+
+        :param model: the model class.
+        :param target_ids: list of primary keys.
+        """
+        from wagtailplus.rich_text import LINK_HANDLERS
+
+        for link_type, handler in LINK_HANDLERS.items():
+            if issubclass(model, handler.model):
+                self.filter(
+                    link_type       = link_type,
+                    target_id__in   = target_ids
+                ).update(is_stale=True)
+
+class RichTextReference(models.Model):
+    """
+    Stores a reference from a flexible rich-text field to a linked
+    Link, Page or Document instance.
+    """
+    content_type    = models.ForeignKey(ContentType, related_name='+')
+    object_id       = models.IntegerField(_(u'Object ID'), db_index=True)
+    content_object  = GenericForeignKey('content_type', 'object_id')
+    field_name      = models.CharField(_(u'Field Name'), max_length=255)
+    link_type       = models.CharField(_(u'Link Type'), max_length=50)
+    target_id       = models.IntegerField(_(u'Target ID'))
+    is_stale        = models.BooleanField(_(u'Stale'), default=False, db_index=True)
+    objects         = RichTextReferenceManager()
+
+    class Meta(object):
+        app_label           = 'wagtailplus'
+        verbose_name        = _(u'Rich-Text Reference')
+        verbose_name_plural = _(u'Rich-Text References')
+        index_together      = (('link_type', 'target_id'),)
+
+def update_rich_text_references(sender, instance, **kwargs):
+    """
+    Updates references for saved instances with flexible rich-text fields.
+
+    :param sender: the sending class.
+    :param instance: the saved instance.
+    """
+    from wagtailplus.fields import get_rich_text_fields
+
+    if not kwargs.get('raw', False) and get_rich_text_fields(sender):
+        RichTextReference.objects.update_for_instance(instance)
+
+def delete_rich_text_references(sender, instance, **kwargs):
+    """
+    Deletes references for deleted instances with flexible rich-text fields.
+
+    :param sender: the sending class.
+    :param instance: the deleted instance.
+    """
+    from wagtailplus.fields import get_rich_text_fields
+
+    if get_rich_text_fields(sender):
+        RichTextReference.objects.delete_for_instance(instance)
+
+def mark_rich_text_stale(sender, instance, **kwargs):
+    """
+    Flags pre-rendered rich-text that links to specified instance.
+
+    :param sender: the sending class.
+    :param instance: the saved or deleted instance.
+    """
+    if not kwargs.get('raw', False):
+        RichTextReference.objects.mark_stale_for_target(instance)
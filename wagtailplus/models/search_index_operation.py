@@ -0,0 +1,119 @@
+"""
+Contains search index operation class definitions.
+"""
+import collections
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class SearchIndexOperationManager(models.Manager):
+    """
+    Custom search index operation manager.
+    """
+    def enqueue(self, instances, backends, action='add'):
+        """
+        Queues specified index action for instances on each backend.
+
+        :param instances: list of model instances.
+        :param backends: list of search backend names.
+        :param action: the index action ("add" or "delete").
+        :rtype: int.
+        """
+        operations = [
+            self.model(
+                content_type    = ContentType.objects.get_for_model(obj),
+                object_id       = obj.pk,
+                backend         = backend,
+                action          = action
+            )
+            for obj in instances
+            for backend in backends
+        ]
+
+        self.bulk_create(operations)
+
+        return len(operations)
+
+    def get_batch(self, after=0, limit=500, max_attempts=None):
+        """
+        Returns dictionary of object IDs keyed by (backend, action, content
+        type ID) for the oldest operations queued after specified primary
+        key, and dictionary of the operation primary keys covered by each
+        group. Only the latest action is kept for each object.
+
+        :param after: the primary key to start after.
+        :param limit: the maximum number of operations.
+        :param max_attempts: skips operations attempted this many times.
+        :rtype: tuple.
+        """
+        qs = self.filter(pk__gt=after)
+        if max_attempts:
+            qs = qs.filter(attempts__lt=max_attempts)
+
+        rows = qs.order_by('pk').values_list(
+            'pk',
+            'backend',
+            'action',
+            'content_type',
+            'object_id'
+        )[:limit]
+
+        actions     = collections.OrderedDict()
+        object_pks  = collections.defaultdict(list)
+
+        for pk, backend, action, content_type_id, object_id in rows:
+            target          = (backend, content_type_id, object_id)
+            actions[target] = action
+            object_pks[target].append(pk)
+
+        groups  = collections.OrderedDict()
+        pks     = collections.defaultdict(list)
+
+        for target, action in actions.items():
+            backend, content_type_id, object_id = target
+            key = (backend, action, content_type_id)
+            groups.setdefault(key, set()).add(object_id)
+            pks[key].extend(object_pks[target])
+
+        return groups, pks
+
+    def record_failure(self, pks, error):
+        """
+        Increments attempt count and stores error for specified operations.
+
+        :param pks: list of operation primary keys.
+        :param error: the exception raised.
+        :rtype: int.
+        """
+        return self.filter(pk__in=pks).update(
+            attempts    = models.F('attempts') + 1,
+            last_error  = u'{0}'.format(error)
+        )
+
+class SearchIndexOperation(models.Model):
+    """
+    Stores a queued search index operation for an instance.
+    """
+    ACTION_ADD      = 'add'
+    ACTION_DELETE   = 'delete'
+    ACTION_CHOICES  = (
+        (ACTION_ADD, _(u'Add')),
+        (ACTION_DELETE, _(u'Delete')),
+    )
+
+    content_type    = models.ForeignKey(ContentType, related_name='+')
+    object_id       = models.PositiveIntegerField(_(u'Object ID'))
+    backend         = models.CharField(_(u'Backend'), max_length=255)
+    action          = models.CharField(_(u'Action'), max_length=10, choices=ACTION_CHOICES)
+    created         = models.DateTimeField(_(u'Created'), auto_now_add=True)
+    attempts        = models.PositiveIntegerField(_(u'Attempts'), default=0)
+    last_error      = models.TextField(_(u'Last Error'), blank=True)
+    objects         = SearchIndexOperationManager()
+
+    class Meta(object):
+        app_label           = 'wagtailplus'
+        verbose_name        = _(u'Search Index Operation')
+        verbose_name_plural = _(u'Search Index Operations')
+        ordering            = ('pk',)
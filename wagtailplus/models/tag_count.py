@@ -0,0 +1,129 @@
+"""
+Contains tag count class definitions.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError
+from django.db import models
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
+
+
+class TagCountManager(models.Manager):
+    """
+    Custom tag count manager.
+    """
+    def get_popular_tags(self, model, limit=10):
+        """
+        Returns list of the most used tags for specified model, each with
+        an "item_count" attribute, like TagSearchable.popular_tags().
+        Falls back to popular_tags() if no counts are stored yet.
+
+        :param model: the model class.
+        :param limit: the maximum number of tags.
+        :rtype: list.
+        """
+        counts = self.filter(
+            content_type    = ContentType.objects.get_for_model(model),
+            count__gt       = 0
+        ).select_related('tag').order_by('-count')[:limit]
+
+        tags = []
+        for tag_count in counts:
+            tag             = tag_count.tag
+            tag.item_count  = tag_count.count
+            tags.append(tag)
+
+        if not tags:
+            return list(model.popular_tags())
+
+        return tags
+
+    def adjust(self, content_type_id, tag_id, delta):
+        """
+        Adds specified delta to the count of specified tag and content
+        type, creating the count if needed.
+
+        :param content_type_id: the content type ID.
+        :param tag_id: the tag ID.
+        :param delta: the change in the number of tagged items.
+        """
+        qs = self.filter(content_type_id=content_type_id, tag_id=tag_id)
+
+        if qs.update(count=models.F('count') + delta) or delta < 0:
+            return
+
+        try:
+            with transaction.atomic():
+                self.create(
+                    content_type_id = content_type_id,
+                    tag_id          = tag_id,
+                    count           = delta
+                )
+        except IntegrityError:
+            # Created concurrently.
+            qs.update(count=models.F('count') + delta)
+
+    def recount(self):
+        """
+        Replaces all counts with counts aggregated from TaggedItem.
+
+        :rtype: int.
+        """
+        from taggit.models import TaggedItem
+
+        rows = TaggedItem.objects.values_list(
+            'content_type',
+            'tag'
+        ).annotate(
+            count = models.Count('pk')
+        ).order_by()
+
+        counts = [
+            self.model(
+                content_type_id = content_type_id,
+                tag_id          = tag_id,
+                count           = count
+            )
+            for content_type_id, tag_id, count in rows
+        ]
+
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(counts)
+
+        return len(counts)
+
+class TagCount(models.Model):
+    """
+    Stores the number of instances of a model that use a tag.
+    """
+    content_type    = models.ForeignKey(ContentType, related_name='+')
+    tag             = models.ForeignKey('taggit.Tag', related_name='+')
+    count           = models.IntegerField(_(u'Count'), default=0)
+    objects         = TagCountManager()
+
+    class Meta(object):
+        app_label           = 'wagtailplus'
+        verbose_name        = _(u'Tag Count')
+        verbose_name_plural = _(u'Tag Counts')
+        unique_together     = (('content_type', 'tag'),)
+        index_together      = (('content_type', 'count'),)
+
+def increment_tag_count(sender, instance, **kwargs):
+    """
+    Increments the count of a tag when added to an item.
+
+    :param sender: the sending class.
+    :param instance: the saved tagged item.
+    """
+    if kwargs.get('created', False) and not kwargs.get('raw', False):
+        TagCount.objects.adjust(instance.content_type_id, instance.tag_id, 1)
+
+def decrement_tag_count(sender, instance, **kwargs):
+    """
+    Decrements the count of a tag when removed from an item.
+
+    :param sender: the sending class.
+    :param instance: the deleted tagged item.
+    """
+    TagCount.objects.adjust(instance.content_type_id, instance.tag_id, -1)
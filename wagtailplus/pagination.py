@@ -0,0 +1,325 @@
+"""
+Contains keyset pagination classes.
+
+Keyset pagination orders rows by (ordering field, primary key) and
+fetches each page with a WHERE clause on the last key seen, instead of
+COUNT(*) and OFFSET queries, so every page is equally fast on large
+tables. Pages expose the same interface as django.core.paginator.Page;
+page "numbers" are opaque cursors, so existing pagination templates that
+pass them back in the "p" parameter keep working.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+from django.utils.encoding import force_bytes
+from django.utils.encoding import force_text
+from django.utils.translation import ugettext as _
+
+
+def encode_cursor(data):
+    """
+    Returns opaque, URL-safe cursor for specified data.
+
+    :param data: the cursor data dictionary.
+    :rtype: str.
+    """
+    data = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return force_text(base64.urlsafe_b64encode(force_bytes(data))).rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Returns data dictionary for specified cursor.
+
+    :param cursor: the cursor string.
+    :rtype: dict.
+    """
+    try:
+        cursor  = force_bytes(cursor)
+        data    = base64.urlsafe_b64decode(cursor + b'=' * (-len(cursor) % 4))
+        data    = json.loads(force_text(data))
+        data    = {
+            'number':   int(data['number']),
+            'key':      list(data['key']),
+            'forward':  bool(data['forward']),
+            'ordering': force_text(data['ordering']),
+        }
+    except (TypeError, ValueError, KeyError, AttributeError):
+        raise InvalidPage(_(u'Invalid page cursor'))
+
+    if len(data['key']) != 2 or None in data['key']:
+        raise InvalidPage(_(u'Invalid page cursor'))
+
+    return data
+
+def is_key_field(model, name):
+    """
+    Returns True if specified model can be paginated by key on specified
+    field, which must be the primary key or a concrete, non-relational
+    column.
+
+    :param model: the model class.
+    :param name: the field name.
+    :rtype: bool.
+    """
+    if name == 'pk':
+        return True
+
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+
+    return field.concrete and not field.is_relation
+
+class KeysetPage(object):
+    """
+    A page of results with cursors to the neighbouring pages.
+    """
+    def __init__(self, object_list, number, paginator, previous_cursor, next_cursor):
+        self.object_list        = object_list
+        self.number             = number
+        self.paginator          = paginator
+        self.previous_cursor    = previous_cursor
+        self.next_cursor        = next_cursor
+
+    def __repr__(self):
+        return '<Page {0}>'.format(self.number)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_page_number(self):
+        return self.next_cursor
+
+    def previous_page_number(self):
+        return self.previous_cursor
+
+class KeysetPaginator(object):
+    """
+    Paginates a queryset by (ordering field, primary key) without
+    counting it. The ordering field should be unique enough and not
+    nullable; ties are broken by primary key.
+
+    Raises ValueError if the ordering field is not a concrete column of
+    the model itself; relations are ordered by the related model's
+    ordering, which the keys would not match.
+    """
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset   = queryset
+        self.per_page   = per_page
+        self.field      = ordering.lstrip('-')
+        self.descending = ordering.startswith('-')
+        self.num_pages  = 1
+
+        if self.field == queryset.model._meta.pk.name:
+            self.field = 'pk'
+        if not is_key_field(queryset.model, self.field):
+            raise ValueError('Cannot paginate by key on "{0}"'.format(self.field))
+
+        # Recorded in cursors, which are only valid for this ordering.
+        self.ordering = '{0}{1}'.format('-' if self.descending else '', self.field)
+
+    def get_field(self):
+        """
+        Returns the ordering field instance.
+
+        :rtype: django.db.models.Field.
+        """
+        opts = self.queryset.model._meta
+        return opts.pk if self.field == 'pk' else opts.get_field(self.field)
+
+    def get_key(self, obj):
+        """
+        Returns (ordering value, primary key) list for specified instance.
+
+        Dates and times are encoded as ISO 8601 strings with their
+        microseconds; the JSON encoder would cut them to milliseconds,
+        and rows within the same millisecond would be skipped or
+        repeated.
+
+        :param obj: the model instance.
+        :rtype: list.
+        """
+        value = getattr(obj, self.get_field().attname)
+        if isinstance(value, (datetime.date, datetime.time)):
+            value = value.isoformat()
+
+        return [value, obj.pk]
+
+    def get_filter(self, key, forward):
+        """
+        Returns Q object selecting rows after (or before) specified key.
+
+        :param key: the (ordering value, primary key) list.
+        :param forward: True for rows after the key.
+        :rtype: django.db.models.Q.
+        """
+        model = self.queryset.model
+        field = self.get_field()
+
+        try:
+            value   = field.to_python(key[0])
+            pk      = model._meta.pk.to_python(key[1])
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidPage(_(u'Invalid page cursor'))
+
+        if value is None or pk is None:
+            raise InvalidPage(_(u'Invalid page cursor'))
+
+        lookup      = 'gt' if forward != self.descending else 'lt'
+        pk_lookup   = 'pk__{0}'.format(lookup)
+
+        return Q(**{'{0}__{1}'.format(self.field, lookup): value}) | Q(
+            **{self.field: value, pk_lookup: pk}
+        )
+
+    def get_ordering(self, forward):
+        """
+        Returns ordering for fetching rows in specified direction.
+
+        :param forward: True for rows after the current page.
+        :rtype: list.
+        """
+        descending  = self.descending != (not forward)
+        prefix      = '-' if descending else ''
+
+        return ['{0}{1}'.format(prefix, self.field), '{0}pk'.format(prefix)]
+
+    def page(self, cursor=None):
+        """
+        Returns page for specified cursor, or the first page.
+
+        :param cursor: the cursor string.
+        :rtype: KeysetPage.
+        """
+        number  = 1
+        forward = True
+        qs      = self.queryset
+
+        if cursor:
+            data = decode_cursor(cursor)
+            if data['ordering'] != self.ordering:
+                raise InvalidPage(_(u'Page cursor does not match the ordering'))
+
+            number  = max(data['number'], 1)
+            forward = data['forward']
+            qs      = qs.filter(self.get_filter(data['key'], forward))
+
+        # Fetch one extra row to find out whether there is another page.
+        rows    = list(qs.order_by(*self.get_ordering(forward))[:self.per_page + 1])
+        more    = len(rows) > self.per_page
+        rows    = rows[:self.per_page]
+
+        if not forward:
+            rows.reverse()
+
+        has_previous    = (more if not forward else bool(cursor)) and number > 1
+        has_next        = more if forward else bool(cursor)
+        previous_cursor = None
+        next_cursor     = None
+
+        if rows and has_previous:
+            previous_cursor = encode_cursor({
+                'number':   number - 1,
+                'key':      self.get_key(rows[0]),
+                'forward':  False,
+                'ordering': self.ordering,
+            })
+        if rows and has_next:
+            next_cursor = encode_cursor({
+                'number':   number + 1,
+                'key':      self.get_key(rows[-1]),
+                'forward':  True,
+                'ordering': self.ordering,
+            })
+
+        # The total is unknown; show "N+" while there are more pages.
+        self.num_pages = '{0}+'.format(number) if next_cursor else number
+
+        return KeysetPage(rows, number, self, previous_cursor, next_cursor)
+
+class KeysetPaginationMixin(object):
+    """
+    Adds opt-in keyset pagination to list views.
+    """
+    keyset_pagination = False
+
+    def get_keyset_ordering(self, queryset, ordering):
+        """
+        Returns the single field used to order keyset pages, with an
+        optional "-" prefix.
+
+        :param queryset: the queryset instance.
+        :param ordering: the requested ordering.
+        :rtype: str.
+        """
+        if not ordering:
+            ordering = (queryset.query.order_by or queryset.model._meta.ordering or ['pk'])[0]
+
+        # Fields that cannot be paginated by key fall back to the
+        # primary key, in the same direction.
+        if not is_key_field(queryset.model, ordering.lstrip('-')):
+            ordering = '{0}pk'.format('-' if ordering.startswith('-') else '')
+
+        return ordering
+
+    def get_cursor_ordering(self):
+        """
+        Returns the ordering recorded in the requested page cursor, so
+        pagination links that do not carry the ordering keep using it.
+
+        :rtype: str.
+        """
+        cursor = self.request.GET.get(self.page_kwarg)
+        if not self.keyset_pagination or not cursor:
+            return ''
+
+        try:
+            return decode_cursor(cursor)['ordering']
+        except InvalidPage:
+            return ''
+
+    def paginate_queryset_by_key(self, queryset, page_size, ordering):
+        """
+        Returns (paginator, page, object list, is paginated) tuple for
+        specified queryset, paginated by key.
+
+        :param queryset: the queryset instance.
+        :param page_size: the number of items per page.
+        :param ordering: the requested ordering.
+        :rtype: tuple.
+        """
+        paginator = KeysetPaginator(
+            queryset,
+            page_size,
+            self.get_keyset_ordering(queryset, ordering)
+        )
+
+        try:
+            page = paginator.page(self.request.GET.get(self.page_kwarg))
+        except InvalidPage as e:
+            raise Http404(force_text(e))
+
+        return (paginator, page, page.object_list, page.has_other_pages())
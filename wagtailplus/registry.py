@@ -0,0 +1,89 @@
+"""
+Contains registries built when the application is ready, or on first
+use.
+"""
+import threading
+
+from django.apps import apps
+
+
+_edit_handler_lock      = threading.Lock()
+_edit_handler_classes   = {}
+
+def get_taggable_page_models():
+    """
+    Returns tuple of (page model, tag through model) tuples for every
+    page model with a "tags" attribute.
+
+    :rtype: tuple.
+    """
+    return apps.get_app_config('wagtailplus').taggable_page_models
+
+def get_page_through_models():
+    """
+    Returns dictionary of tag through models keyed by the page model
+    whose "tags" they hold; generic through models are left out.
+
+    :rtype: dict.
+    """
+    return apps.get_app_config('wagtailplus').page_through_models
+
+def build_edit_handler_class(model, panels=None):
+    """
+    Returns new edit handler class for specified model: the model's own
+    handler if it defines "get_edit_handler", or an object list of
+    specified panels (or panels extracted from the model) that skips
+    rendering missing fields, as we may want to limit the number of
+    fields presented to the user.
+
+    :param model: the model class.
+    :param panels: optional list of panel definitions.
+    :rtype: class.
+    """
+    from wagtail.wagtailadmin.edit_handlers import BaseObjectList
+    from wagtail.wagtailadmin.edit_handlers import extract_panel_definitions_from_model_class
+
+    if panels is None and hasattr(model, 'get_edit_handler'):
+        return model.get_edit_handler()
+
+    if panels is None:
+        panels = extract_panel_definitions_from_model_class(model)
+
+    class BaseChooserObjectList(BaseObjectList):
+        def render_missing_fields(self):
+            return ''
+
+    return type('_ChooserObjectList', (BaseChooserObjectList,), {
+        'children': panels,
+    })
+
+def get_edit_handler_class(model, panels=None):
+    """
+    Returns edit handler class for specified model and panels, built
+    once and then reused.
+
+    :param model: the model class.
+    :param panels: optional list of panel definitions.
+    :rtype: class.
+    """
+    key = (model, tuple(panels) if panels is not None else None)
+
+    if key not in _edit_handler_classes:
+        with _edit_handler_lock:
+            if key not in _edit_handler_classes:
+                _edit_handler_classes[key] = build_edit_handler_class(model, panels)
+
+    return _edit_handler_classes[key]
+
+def reset_edit_handler_classes(model=None):
+    """
+    Discards memoized edit handler classes, and so their form classes,
+    for specified model, or for all models; call after changing panel
+    definitions at runtime.
+
+    :param model: optional model class.
+    """
+    with _edit_handler_lock:
+        for key in list(_edit_handler_classes):
+            if model is None or key[0] is model:
+                del _edit_handler_classes[key]
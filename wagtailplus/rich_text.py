@@ -1,8 +1,14 @@
 """
 Contains rich-text related classes.
 """
+import collections
+import contextlib
+import itertools
 import re
+import threading
 
+from bs4 import BeautifulSoup
+from bs4 import Tag
 from django.utils.html import escape
 
 from wagtail.wagtailcore import hooks
@@ -13,7 +19,52 @@ from wagtail.wagtaildocs.models import Document
 from wagtailplus.wagtaillinks.models import Link
 
 
-def expand_db_attributes_for_model(model, attrs, for_editor):
+
+_identity_map = threading.local()
+
+def activate_identity_map():
+    """
+    Activates an identity map for link targets in the current thread, so
+    that each target is loaded at most once until it is deactivated.
+    """
+    if getattr(_identity_map, 'instances', None) is None:
+        _identity_map.instances = {}
+        _identity_map.depth     = 0
+    _identity_map.depth += 1
+
+def deactivate_identity_map():
+    """
+    Deactivates the identity map for the current thread.
+    """
+    if getattr(_identity_map, 'instances', None) is None:
+        return
+
+    _identity_map.depth -= 1
+    if _identity_map.depth <= 0:
+        _identity_map.instances = None
+
+def get_identity_map():
+    """
+    Returns dictionary of loaded instances keyed by model, or None if no
+    identity map is active.
+
+    :rtype: dict.
+    """
+    return getattr(_identity_map, 'instances', None)
+
+@contextlib.contextmanager
+def identity_map():
+    """
+    Context manager that shares loaded link targets between every
+    rich-text expansion within its scope.
+    """
+    activate_identity_map()
+    try:
+        yield
+    finally:
+        deactivate_identity_map()
+
+def expand_db_attributes_for_model(model, attrs, for_editor, instances=None, urls=None):
     """
     Given a dictionary of attributes from the <a> tag, return
     the real HTML representation.
@@ -21,22 +72,33 @@ def expand_db_attributes_for_model(model, attrs, for_editor):
     :param model: the model class.
     :param attrs: dictionary of database attributes.
     :param for_editor: flag to display in editor or frontend.
+    :param instances: optional dictionary of preloaded instances keyed by ID.
+    :param urls: optional dictionary of resolved URLs keyed by ID.
     :rtype: str.
     """
     editor_attrs = ''
 
     try:
-        obj = model.objects.get(id=attrs['id'])
+        if instances is None:
+            obj = model.objects.get(id=attrs['id'])
+        else:
+            obj = instances.get(model._meta.pk.to_python(attrs['id']))
+            if obj is None:
+                raise model.DoesNotExist
 
         if for_editor:
             link_type       = model._meta.model.__name__.lower()
             editor_attrs    = 'data-linktype="{0}" data-id="{1}"'
             editor_attrs    = editor_attrs.format(link_type, obj.id)
 
+        url = urls.get(obj.id) if urls is not None else None
+        if url is None:
+            url = obj.url
+
         # Include title attribute for 508 compliance.
         return '<a {0} href="{1}" title="{2}">'.format(
             editor_attrs,
-            escape(obj.url),
+            escape(url),
             obj.title
         )
     except model.DoesNotExist:
@@ -56,16 +118,65 @@ class BetterHandler(object):
         return {'id': tag['data-id']}
 
     @classmethod
-    def expand_db_attributes(cls, attrs, for_editor):
+    def get_instances(cls, ids):
+        """
+        Returns dictionary of model instances for specified IDs,
+        loaded with a single query. When an identity map is active,
+        only instances it does not already hold are loaded.
+
+        :param ids: iterable of instance IDs.
+        :rtype: dict.
+        """
+        loaded = get_identity_map()
+        if loaded is None:
+            return cls.model.objects.in_bulk(list(ids))
+
+        loaded  = loaded.setdefault(cls.model, {})
+        pks     = set(cls.model._meta.pk.to_python(pk) for pk in ids)
+        missing = [pk for pk in pks if pk not in loaded]
+
+        if missing:
+            found = cls.model.objects.in_bulk(missing)
+            # Remember missing instances too, so they are not queried again.
+            for pk in missing:
+                loaded[pk] = found.get(pk)
+
+        return dict((pk, loaded[pk]) for pk in pks if loaded[pk] is not None)
+
+    @classmethod
+    def get_urls(cls, instances):
+        """
+        Returns dictionary of resolved URLs for specified instances keyed
+        by ID, or None to read each instance's "url" attribute.
+
+        :param instances: dictionary of instances keyed by ID.
+        :rtype: dict.
+        """
+        return None
+
+    @classmethod
+    def expand_db_attributes(cls, attrs, for_editor, instances=None, urls=None):
         """
         Given a dictionary of attributes from the <a> tag, return
         the real HTML representation.
 
         :param attrs: dictionary of database attributes.
         :param for_editor: flag to display in editor or frontend.
+        :param instances: optional dictionary of preloaded instances.
+        :param urls: optional dictionary of resolved URLs.
         :rtype: str.
         """
-        return expand_db_attributes_for_model(cls.model, attrs, for_editor)
+        if instances is None and get_identity_map() is not None:
+            instances   = cls.get_instances([attrs['id']])
+            urls        = cls.get_urls(instances)
+
+        return expand_db_attributes_for_model(
+            cls.model,
+            attrs,
+            for_editor,
+            instances,
+            urls
+        )
 
 class BetterDocumentLinkHandler(BetterHandler):
     """
@@ -87,6 +198,18 @@ class BetterPageLinkHandler(BetterHandler):
     """
     model = Page
 
+    @classmethod
+    def get_urls(cls, instances):
+        """
+        Returns dictionary of page URLs keyed by ID, served from the page
+        URL cache when it is enabled.
+
+        :param instances: dictionary of pages keyed by ID.
+        :rtype: dict.
+        """
+        from .cache import get_page_urls
+        return get_page_urls(instances)
+
 class BetterLinkHandler(BetterHandler):
     """
     BetterLinkHandler will be invoked whenever we encounter an element
@@ -106,9 +229,27 @@ LINK_HANDLERS = {
 class FlexibleDbWhitelister(Whitelister):
     """
     Prevents automatic replacement of 'DIV' tags with 'P' tags.
+
+    Documents are parsed with html5lib, like the stock DbWhitelister;
+    other parsers collapse whitespace and repair broken nesting
+    differently, so their output would not match.
     """
     has_loaded_custom_whitelist_rules = False
 
+    @classmethod
+    def load_element_rules(cls):
+        """
+        Merges element rules from "construct_whitelister_element_rules"
+        hooks into a single dispatch table, once.
+        """
+        if not cls.has_loaded_custom_whitelist_rules:
+            element_rules = cls.element_rules.copy()
+            for fn in hooks.get_hooks('construct_whitelister_element_rules'):
+                element_rules.update(fn())
+
+            cls.element_rules                       = element_rules
+            cls.has_loaded_custom_whitelist_rules   = True
+
     @classmethod
     def clean(cls, html):
         """
@@ -117,13 +258,75 @@ class FlexibleDbWhitelister(Whitelister):
         :param html: the HTML to clean.
         :rtype: str.
         """
-        if not cls.has_loaded_custom_whitelist_rules:
-            for fn in hooks.get_hooks('construct_whitelister_element_rules'):
-                cls.element_rules = cls.element_rules.copy()
-                cls.element_rules.update(fn())
-            cls.has_loaded_custom_whitelist_rules = True
+        cls.load_element_rules()
+
+        doc = BeautifulSoup(html, 'html5lib')
+        cls.clean_node(doc, doc)
+
+        return doc.decode()
 
-        return super(FlexibleDbWhitelister, cls).clean(html)
+    @classmethod
+    def clean_node(cls, doc, node):
+        """
+        Cleans specified node, returning True if its parent should
+        replace it with its contents.
+
+        :param doc: the document instance.
+        :param node: the node instance.
+        :rtype: bool.
+        """
+        if isinstance(node, Tag):
+            return cls.clean_tag_node(doc, node)
+
+        return super(FlexibleDbWhitelister, cls).clean_node(doc, node)
+
+    @classmethod
+    def clean_children(cls, doc, tag):
+        """
+        Cleans child nodes of specified tag. Children that need to be
+        unwrapped are replaced by their contents in a single pass, as
+        doing so one at a time is quadratic in the number of siblings.
+
+        :param doc: the document instance.
+        :param tag: the tag instance.
+        """
+        unwrapped = set()
+
+        for child in list(tag.contents):
+            if cls.clean_node(doc, child):
+                unwrapped.add(id(child))
+
+        if not unwrapped:
+            return
+
+        contents = []
+        for child in tag.contents:
+            if id(child) in unwrapped:
+                # Drop the tag itself from the document element chain.
+                if child.previous_element is not None:
+                    child.previous_element.next_element = child.next_element
+                if child.next_element is not None:
+                    child.next_element.previous_element = child.previous_element
+
+                if isinstance(child, Tag):
+                    contents.extend(child.contents)
+                    child.contents = []
+                child.parent = None
+            else:
+                contents.append(child)
+
+        # Re-link the spliced children to their new parent and siblings.
+        previous = None
+        for child in contents:
+            child.parent            = tag
+            child.previous_sibling  = previous
+            if previous is not None:
+                previous.next_sibling = child
+            previous = child
+        if previous is not None:
+            previous.next_sibling = None
+
+        tag.contents = contents
 
     @classmethod
     def clean_tag_node(cls, doc, tag):
@@ -132,6 +335,7 @@ class FlexibleDbWhitelister(Whitelister):
 
         :param doc: the document instance.
         :param tag: the tag instance.
+        :rtype: bool.
         """
         if 'data-embedtype' in tag.attrs:
             embed_type = tag['data-embedtype']
@@ -146,8 +350,7 @@ class FlexibleDbWhitelister(Whitelister):
 
         elif tag.name == 'a' and 'data-linktype' in tag.attrs:
             # First, whitelist the contents of this tag.
-            for child in tag.contents:
-                cls.clean_node(doc, child)
+            cls.clean_children(doc, tag)
 
             link_type               = tag['data-linktype']
             link_handler            = LINK_HANDLERS['link']
@@ -157,10 +360,22 @@ class FlexibleDbWhitelister(Whitelister):
             tag.attrs.clear()
             tag.attrs.update(**link_attrs)
         else:
-            super(FlexibleDbWhitelister, cls).clean_tag_node(doc, tag)
+            # Whitelist the contents, then apply the rule for this element
+            # type straight from the merged dispatch table.
+            cls.clean_children(doc, tag)
+
+            rule = cls.element_rules.get(tag.name)
+            if rule is None:
+                # Unrecognized element type; the parent unwraps it.
+                return True
+
+            rule(tag)
+
+        return False
 
 FIND_A_TAG      = re.compile(r'<a(\b[^>]*)>')
 FIND_EMBED_TAG  = re.compile(r'<embed(\b[^>]*)/>')
+FIND_TAG        = re.compile(r'<a(\b[^>]*)>|<embed(\b[^>]*)/>')
 FIND_ATTRS      = re.compile(r'([\w-]+)\="([^"]*)"')
 
 def extract_attrs(attr_string):
@@ -176,30 +391,151 @@ def extract_attrs(attr_string):
         attributes[name] = val
     return attributes
 
-def expand_db_html(html, for_editor=False):
+def iter_db_tags(html):
     """
-    Expand database-representation HTML into proper HTML usable in either
-    templates or the rich-text editor.
+    Yields a (match, attributes) tuple for every link and embed tag that
+    needs expanding, scanning the HTML once. Plain anchors are skipped
+    without parsing their attributes.
 
     :param html: the HTML to parse.
+    :rtype: generator.
+    """
+    for m in FIND_TAG.finditer(html):
+        a_attrs, embed_attrs = m.groups()
+
+        if a_attrs is None:
+            yield m, extract_attrs(embed_attrs)
+        elif 'linktype' in a_attrs:
+            attrs = extract_attrs(a_attrs)
+            if 'linktype' in attrs:
+                yield m, attrs
+
+def get_link_ids(html):
+    """
+    Returns dictionary of linked instance IDs keyed by link type.
+
+    :param html: the HTML to parse.
+    :rtype: dict.
+    """
+    return get_tag_link_ids(iter_db_tags(html))
+
+def get_tag_link_ids(tags):
+    """
+    Returns dictionary of linked instance IDs keyed by link type.
+
+    :param tags: iterable of (match, attributes) tuples.
+    :rtype: dict.
+    """
+    link_ids = collections.defaultdict(set)
+
+    for m, attrs in tags:
+        if m.group(1) is not None:
+            link_ids[attrs['linktype']].add(attrs['id'])
+
+    return link_ids
+
+def get_link_instances(link_ids):
+    """
+    Returns dictionary of linked instances keyed by link type, using
+    one query per link type.
+
+    :param link_ids: dictionary of instance IDs keyed by link type.
+    :rtype: dict.
+    """
+    instances = {}
+
+    for link_type, ids in link_ids.items():
+        handler                 = LINK_HANDLERS[link_type]
+        instances[link_type]    = handler.get_instances(ids)
+
+    return instances
+
+def get_link_urls(instances):
+    """
+    Returns dictionary of resolved URLs keyed by link type, for link
+    types whose handlers resolve URLs in bulk.
+
+    :param instances: dictionary of preloaded instances keyed by link type.
+    :rtype: dict.
+    """
+    urls = {}
+
+    for link_type, objs in instances.items():
+        handler_urls = LINK_HANDLERS[link_type].get_urls(objs)
+        if handler_urls is not None:
+            urls[link_type] = handler_urls
+
+    return urls
+
+def expand_db_tag(m, attrs, for_editor, instances, urls=None):
+    """
+    Returns the real HTML representation of a link or embed tag.
+
+    :param m: the tag match object.
+    :param attrs: dictionary of database attributes.
     :param for_editor: flag to display in editor or frontend.
+    :param instances: dictionary of preloaded instances keyed by link type.
+    :param urls: optional dictionary of resolved URLs keyed by link type.
     :rtype: str.
     """
-    def replace_a_tag(m):
-        attrs = extract_attrs(m.group(1))
-        if 'linktype' not in attrs:
-            # Return unchanged.
-            return m.group(0)
+    if m.group(1) is not None:
+        link_type   = attrs['linktype']
+        handler     = LINK_HANDLERS[link_type]
+        return handler.expand_db_attributes(
+            attrs,
+            for_editor,
+            instances[link_type],
+            (urls or {}).get(link_type)
+        )
+
+    handler = EMBED_HANDLERS[attrs['embedtype']]
+    return handler.expand_db_attributes(attrs, for_editor)
 
-        handler = LINK_HANDLERS[attrs['linktype']]
-        return handler.expand_db_attributes(attrs, for_editor)
+def iter_expand_db_html(html, for_editor=False, batch_size=100):
+    """
+    Yields chunks of expanded HTML, suitable for streaming large documents
+    (e.g. with django.http.StreamingHttpResponse).
 
-    def replace_embed_tag(m):
-        attrs = extract_attrs(m.group(1))
-        handler = EMBED_HANDLERS[attrs['embedtype']]
-        return handler.expand_db_attributes(attrs, for_editor)
+    Tags are processed in batches; linked instances for each batch are
+    loaded in bulk before the batch is rendered.
 
-    html = FIND_A_TAG.sub(replace_a_tag, html)
-    html = FIND_EMBED_TAG.sub(replace_embed_tag, html)
+    :param html: the HTML to parse.
+    :param for_editor: flag to display in editor or frontend.
+    :param batch_size: number of tags per chunk, or None for a single chunk.
+    :rtype: generator.
+    """
+    tags        = iter_db_tags(html)
+    position    = 0
 
-    return html
+    while True:
+        batch = list(itertools.islice(tags, batch_size))
+        if not batch:
+            break
+
+        instances   = get_link_instances(get_tag_link_ids(batch))
+        urls        = get_link_urls(instances)
+        chunks      = []
+
+        for m, attrs in batch:
+            chunks.append(html[position:m.start()])
+            chunks.append(expand_db_tag(m, attrs, for_editor, instances, urls))
+            position = m.end()
+
+        yield ''.join(chunks)
+
+    yield html[position:]
+
+def expand_db_html(html, for_editor=False):
+    """
+    Expand database-representation HTML into proper HTML usable in either
+    templates or the rich-text editor.
+
+    Link and embed tags are found in a single scan, and linked instances
+    are loaded in bulk, so the number of queries does not grow with the
+    number of links.
+
+    :param html: the HTML to parse.
+    :param for_editor: flag to display in editor or frontend.
+    :rtype: str.
+    """
+    return ''.join(iter_expand_db_html(html, for_editor, batch_size=None))
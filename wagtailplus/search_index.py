@@ -0,0 +1,217 @@
+"""
+Contains helper functions for updating search indexes.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from wagtail.wagtailsearch.backends import get_search_backend
+
+from .app_settings import SEARCH_INDEX_QUEUE
+from .generic import get_select_related
+
+
+def get_search_backend_names():
+    """
+    Returns list of configured search backend names; both direct and
+    queued index updates are sent to these backends.
+
+    :rtype: list.
+    """
+    backends = getattr(settings, 'WAGTAILSEARCH_BACKENDS', None)
+
+    if backends is None:
+        return ['default']
+
+    return list(backends.keys())
+
+def check_queue_backends():
+    """
+    Raises ImproperlyConfigured unless every search backend has
+    AUTO_UPDATE set to False when SEARCH_INDEX_QUEUE is set; Wagtail
+    would otherwise still update them inline on every save.
+    """
+    backends = getattr(settings, 'WAGTAILSEARCH_BACKENDS', None) or {'default': {}}
+
+    for name, params in backends.items():
+        if params.get('AUTO_UPDATE', True):
+            raise ImproperlyConfigured(
+                'SEARCH_INDEX_QUEUE requires AUTO_UPDATE to be False for '
+                'search backend "{0}".'.format(name)
+            )
+
+def get_search_backends():
+    """
+    Returns list of search backend instances, in the same order as
+    get_search_backend_names().
+
+    :rtype: list.
+    """
+    return [get_search_backend(name) for name in get_search_backend_names()]
+
+def get_index_queryset(model):
+    """
+    Returns queryset of indexed instances for specified model, with tags
+    prefetched and related fields selected.
+
+    :param model: the model class.
+    :rtype: django.db.models.query.QuerySet.
+    """
+    # The model's indexed objects already prefetch the tagged items read
+    # by "get_tags", where it uses TagSearchable.
+    queryset    = model.get_indexed_objects()
+    fields      = get_select_related(model)
+
+    if fields:
+        queryset = queryset.select_related(*fields)
+
+    return queryset
+
+def delete_bulk(backend, model, instances):
+    """
+    Removes specified instances of specified model from specified search
+    backend, with a single bulk request on Elasticsearch backends; other
+    backends remove them one by one.
+
+    :param backend: the search backend instance.
+    :param model: the model class.
+    :param instances: list of model instances.
+    """
+    from wagtail.wagtailsearch.index import class_is_indexed
+
+    if not instances or not class_is_indexed(model):
+        return
+
+    if not hasattr(backend, 'es'):
+        for obj in instances:
+            backend.delete(obj)
+        return
+
+    from elasticsearch.helpers import BulkIndexError
+    from elasticsearch.helpers import bulk
+    from wagtail.wagtailsearch.backends.elasticsearch import ElasticSearchMapping
+
+    mapping = ElasticSearchMapping(model)
+    actions = [
+        {
+            '_op_type': 'delete',
+            '_index':   backend.es_index,
+            '_type':    mapping.get_document_type(),
+            '_id':      mapping.get_document_id(obj),
+        }
+        for obj in instances
+    ]
+
+    # Documents that are already gone are not an error.
+    success, errors = bulk(backend.es, actions, raise_on_error=False)
+    errors          = [
+        error for error in errors
+        if error.get('delete', {}).get('status') != 404
+    ]
+
+    if errors:
+        raise BulkIndexError('{0} document(s) failed to delete.'.format(len(errors)), errors)
+
+def add_to_index(instances):
+    """
+    Adds specified instances to all search backends, or queues them for
+    the process_search_index_queue command if SEARCH_INDEX_QUEUE is set.
+
+    :param instances: list of model instances.
+    """
+    from wagtailplus.models import SearchIndexOperation
+
+    if SEARCH_INDEX_QUEUE:
+        SearchIndexOperation.objects.enqueue(
+            instances,
+            get_search_backend_names(),
+            SearchIndexOperation.ACTION_ADD
+        )
+        return
+
+    for backend in get_search_backends():
+        for obj in instances:
+            backend.add(obj)
+
+def update_index(model, pks, batch_size=500):
+    """
+    Adds instances of specified model with specified primary keys to all
+    search backends in batches, or queues them if SEARCH_INDEX_QUEUE is
+    set.
+
+    :param model: the model class.
+    :param pks: list of primary keys.
+    :param batch_size: the number of instances per batch.
+    """
+    from wagtailplus.models import SearchIndexOperation
+
+    if SEARCH_INDEX_QUEUE:
+        SearchIndexOperation.objects.enqueue(
+            [model(pk=pk) for pk in pks],
+            get_search_backend_names(),
+            SearchIndexOperation.ACTION_ADD
+        )
+        return
+
+    backends = get_search_backends()
+
+    for i in range(0, len(pks), batch_size):
+        instances = list(get_index_queryset(model).filter(pk__in=pks[i:i + batch_size]))
+        for backend in backends:
+            backend.add_bulk(model, instances)
+
+def remove_from_index(model, pks, batch_size=500):
+    """
+    Removes instances of specified model with specified primary keys from
+    all search backends in batches, or queues their removal if
+    SEARCH_INDEX_QUEUE is set. The instances may already be deleted.
+
+    Instances deleted by wagtailplus.bulk.bulk_delete() send no signals,
+    so Wagtail's own handler does not remove them and this is the only
+    removal.
+
+    :param model: the model class.
+    :param pks: list of primary keys.
+    :param batch_size: the number of instances per request.
+    """
+    from wagtailplus.models import SearchIndexOperation
+
+    # Backends only need the class and primary key to remove an instance.
+    instances = [model(pk=pk) for pk in pks]
+
+    if SEARCH_INDEX_QUEUE:
+        SearchIndexOperation.objects.enqueue(
+            instances,
+            get_search_backend_names(),
+            SearchIndexOperation.ACTION_DELETE
+        )
+        return
+
+    backends = get_search_backends()
+
+    for i in range(0, len(instances), batch_size):
+        for backend in backends:
+            delete_bulk(backend, model, instances[i:i + batch_size])
+
+def queue_index_add(instance, **kwargs):
+    """
+    Queues specified saved instance for indexing, in place of Wagtail's
+    auto-update handler.
+
+    :param instance: the model instance.
+    """
+    indexed_instance = instance.get_indexed_instance()
+
+    if indexed_instance is not None:
+        add_to_index([indexed_instance])
+
+def queue_index_delete(instance, **kwargs):
+    """
+    Queues specified deleted instance for removal from the index, in
+    place of Wagtail's auto-update handler.
+
+    :param instance: the model instance.
+    """
+    indexed_instance = instance.get_indexed_instance()
+
+    if indexed_instance is not None:
+        remove_from_index(type(indexed_instance), [indexed_instance.pk])
@@ -0,0 +1,196 @@
+"""
+Contains the tag similarity engine, which scores every pair of tagged
+objects from a sparse object x tag incidence matrix.
+
+Requires numpy and scipy.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+
+from taggit.models import TaggedItem
+
+from .models.related_item import METHOD_JACCARD
+from .models.related_item import METHOD_TFIDF
+from .models.related_item import RelatedItem
+from .registry import get_page_through_models
+from .models.related_item import is_related_source
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:
+    numpy   = None
+    sparse  = None
+
+
+def check_dependencies():
+    """
+    Raises ImproperlyConfigured if numpy or scipy is not installed.
+    """
+    if numpy is None or sparse is None:
+        raise ImproperlyConfigured(
+            'Tag similarity scoring requires numpy and scipy.'
+        )
+
+def iter_tagged_objects():
+    """
+    Yields (content type ID, object ID, tag ID) tuples for generic tagged
+    items and tagged pages.
+
+    :rtype: generator.
+    """
+    rows = TaggedItem.objects.values_list(
+        'content_type',
+        'object_id',
+        'tag'
+    ).order_by()
+
+    for row in rows.iterator():
+        yield row
+
+    for model, through in get_page_through_models().items():
+        content_type    = ContentType.objects.get_for_model(model)
+        rows            = through.objects.values_list(
+            'content_object',
+            'tag'
+        ).order_by()
+
+        for object_id, tag_id in rows.iterator():
+            yield content_type.id, object_id, tag_id
+
+def build_incidence_matrix():
+    """
+    Returns list of (content type ID, object ID) keys and a binary sparse
+    matrix with one row per key and one column per tag.
+
+    :rtype: tuple.
+    """
+    check_dependencies()
+
+    keys    = {}
+    tags    = {}
+    rows    = []
+    cols    = []
+
+    for content_type_id, object_id, tag_id in iter_tagged_objects():
+        rows.append(keys.setdefault((content_type_id, object_id), len(keys)))
+        cols.append(tags.setdefault(tag_id, len(tags)))
+
+    matrix = sparse.csr_matrix(
+        (numpy.ones(len(rows)), (rows, cols)),
+        shape = (len(keys), len(tags))
+    )
+
+    # Duplicate rows would otherwise count twice.
+    matrix.data[:] = 1
+
+    ordered = [None] * len(keys)
+    for key, index in keys.items():
+        ordered[index] = key
+
+    return ordered, matrix
+
+def get_tfidf_matrix(matrix):
+    """
+    Returns TF-IDF weighted copy of specified incidence matrix, with
+    rows scaled to unit length so that their dot products are cosine
+    similarities.
+
+    :param matrix: the binary incidence matrix.
+    :rtype: scipy.sparse.csr_matrix.
+    """
+    counts  = numpy.asarray(matrix.sum(axis=0)).ravel()
+    idf     = numpy.log(float(matrix.shape[0]) / numpy.maximum(counts, 1))
+    weighted = sparse.csr_matrix(matrix.multiply(idf))
+
+    norms = numpy.sqrt(numpy.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    scale = numpy.zeros_like(norms)
+    scale[norms > 0] = 1.0 / norms[norms > 0]
+
+    return sparse.csr_matrix(sparse.diags(scale).dot(weighted))
+
+def iter_neighbours(matrix, method, rows, k, block_size):
+    """
+    Yields (row, [(column, score), ...]) tuples with the k highest
+    scoring other rows for each of specified rows. Similarities are
+    computed for blocks of rows at a time, as sparse matrix products.
+
+    :param matrix: the binary incidence matrix.
+    :param method: METHOD_TFIDF or METHOD_JACCARD.
+    :param rows: list of row indices to score.
+    :param k: the number of neighbours per row.
+    :param block_size: the number of rows per block.
+    :rtype: generator.
+    """
+    if method == METHOD_TFIDF:
+        weighted = get_tfidf_matrix(matrix)
+    else:
+        weighted = matrix
+        sizes = numpy.asarray(matrix.sum(axis=1)).ravel()
+
+    transposed = weighted.T.tocsr()
+
+    for start in range(0, len(rows), block_size):
+        block   = rows[start:start + block_size]
+        product = sparse.csr_matrix(weighted[block].dot(transposed))
+
+        for i, row in enumerate(block):
+            lo, hi  = product.indptr[i], product.indptr[i + 1]
+            cols    = product.indices[lo:hi]
+            scores  = product.data[lo:hi]
+
+            if method == METHOD_JACCARD:
+                # Intersections over unions of the tag sets.
+                scores = scores / (sizes[row] + sizes[cols] - scores)
+
+            keep    = (cols != row) & (scores > 0)
+            cols    = cols[keep]
+            scores  = scores[keep]
+
+            if len(scores) > k:
+                top     = numpy.argpartition(-scores, k)[:k]
+                cols    = cols[top]
+                scores  = scores[top]
+
+            yield row, list(zip(cols.tolist(), scores.tolist()))
+
+def compute_similarity(method, k=50, block_size=500):
+    """
+    Computes the k nearest neighbours of every RelatedItemsMixin object
+    with specified method, and stores them as related items.
+
+    :param method: METHOD_TFIDF or METHOD_JACCARD.
+    :param k: the number of neighbours per object.
+    :param block_size: the number of objects scored per block.
+    :rtype: int.
+    """
+    check_dependencies()
+
+    if method not in (METHOD_TFIDF, METHOD_JACCARD):
+        raise ValueError('Unknown similarity method: {0}'.format(method))
+
+    keys, matrix    = build_incidence_matrix()
+    sources         = {}
+
+    for content_type_id, object_id in keys:
+        if content_type_id not in sources:
+            sources[content_type_id] = is_related_source(content_type_id)
+
+    rows    = [i for i, key in enumerate(keys) if sources[key[0]]]
+    batch   = []
+    scored  = []
+
+    for row, neighbours in iter_neighbours(matrix, method, rows, k, block_size):
+        scored.append(keys[row])
+        for col, score in neighbours:
+            batch.append((keys[row], keys[col], score))
+
+        if len(scored) >= block_size:
+            RelatedItem.objects.replace_scores(method, scored, batch)
+            batch   = []
+            scored  = []
+
+    if scored:
+        RelatedItem.objects.replace_scores(method, scored, batch)
+
+    return len(rows)
@@ -3,6 +3,7 @@ Contains template tags used in the admin home page.
 """
 from django import template
 
+from wagtailplus.counters import get_count
 from wagtailplus.wagtailaddresses.models import Address
 from wagtailplus.wagtailcontacts.models import Contact
 from wagtailplus.wagtailevents.models import BaseEvent
@@ -18,7 +19,7 @@ def total_addresses():
 
     :rtype: int.
     """
-    return Address.objects.count()
+    return get_count(Address)
 
 @register.assignment_tag
 def total_contacts():
@@ -27,7 +28,7 @@ def total_contacts():
 
     :rtype: int.
     """
-    return Contact.objects.count()
+    return get_count(Contact)
 
 @register.assignment_tag
 def total_events():
@@ -36,7 +37,7 @@ def total_events():
 
     :rtype: int.
     """
-    return BaseEvent.objects.count()
+    return get_count(BaseEvent)
 
 @register.assignment_tag
 def total_links():
@@ -45,4 +46,4 @@ def total_links():
 
     :rtype: int.
     """
-    return Link.objects.count()
+    return get_count(Link)
@@ -4,7 +4,9 @@ Contains wagtail plus tags.
 from django import template
 from django.utils.safestring import mark_safe
 
-from wagtailplus.rich_text import expand_db_html
+from wagtailplus.cache import get_rendered_html
+from wagtailplus.fields import RenderedRichText
+from wagtailplus.fields import RichTextSource
 
 
 
@@ -13,13 +15,21 @@ register = template.Library()
 @register.filter
 def flexiblerichtext(value):
     """
-    Returns HTML from specified value.
+    Returns HTML from specified value, using the rich-text cache
+    if enabled. Pre-rendered values, and values of pre-rendered fields,
+    are served from the stored rendering.
 
     :param value: the value to return.
     :rtype: str.
     """
+    if isinstance(value, RenderedRichText):
+        return value
+
+    if isinstance(value, RichTextSource):
+        return value.rendered
+
     if value is not None:
-        html = expand_db_html(value)
+        html = get_rendered_html(value)
     else:
         html = ''
 
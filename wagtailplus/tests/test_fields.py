@@ -0,0 +1,57 @@
+"""
+Contains flexible rich-text field tests.
+"""
+import pickle
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from wagtailplus import cache
+from wagtailplus.fields import FlexibleRichTextArea
+from wagtailplus.fields import RenderedRichText
+from wagtailplus.fields import RichTextSource
+from wagtailplus.rich_text import expand_db_html
+
+
+class RichTextSourceTestCase(SimpleTestCase):
+    """
+    Checks pre-rendered rich-text values in edit forms.
+    """
+    html = '<p>Stored <b>rich</b> text.</p>'
+
+    def setUp(self):
+        self.clean_cache                = cache.RICH_TEXT_CLEAN_CACHE
+        cache.RICH_TEXT_CLEAN_CACHE     = 'default'
+
+    def tearDown(self):
+        cache.RICH_TEXT_CLEAN_CACHE = self.clean_cache
+
+    def test_pickle(self):
+        value       = RichTextSource(self.html, RenderedRichText(self.html))
+        restored    = pickle.loads(pickle.dumps(value))
+
+        self.assertEqual(restored, value)
+        self.assertEqual(restored.rendered, value.rendered)
+
+    def test_render_and_submit(self):
+        value       = RichTextSource(self.html, RenderedRichText(self.html))
+        widget      = FlexibleRichTextArea()
+        editor_html = expand_db_html(self.html, for_editor=True)
+
+        widget.render('body', value)
+        submitted = widget.value_from_datadict({'body': editor_html}, {}, 'body')
+
+        self.assertEqual(submitted, self.html)
+        self.assertIs(type(submitted), type(u''))
+
+    def test_unreadable_entry_is_cleaned(self):
+        editor_html = '<p>Edited <span>text</span>.</p>'
+        caches['default'].set(cache.get_editor_html_key(editor_html), 42)
+
+        submitted = FlexibleRichTextArea().value_from_datadict(
+            {'body': editor_html},
+            {},
+            'body'
+        )
+
+        self.assertEqual(submitted, '<p>Edited text.</p>')
@@ -0,0 +1,63 @@
+"""
+Contains keyset pagination tests.
+"""
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from wagtailplus.pagination import KeysetPaginator
+from wagtailplus.wagtaillinks.models import Link
+
+
+class KeysetPaginatorTestCase(TestCase):
+    """
+    Checks that keyset pages cover every row exactly once.
+    """
+    def setUp(self):
+        created_at = datetime.datetime(2015, 6, 1, 12, 0, 0, 250100, tzinfo=timezone.utc)
+
+        # Five rows within the same millisecond.
+        for i in range(5):
+            link = Link.objects.create(
+                title           = 'Link {0}'.format(i),
+                external_url    = 'http://example.com/{0}'.format(i)
+            )
+            Link.objects.filter(pk=link.pk).update(
+                created_at=created_at + datetime.timedelta(microseconds=i * 100)
+            )
+
+    def get_pages(self, ordering):
+        paginator   = KeysetPaginator(Link.objects.all(), 2, ordering)
+        page        = paginator.page()
+        pages       = [list(page)]
+
+        while page.has_next():
+            page = paginator.page(page.next_page_number())
+            pages.append(list(page))
+
+        return pages
+
+    def check_ordering(self, ordering):
+        pages   = self.get_pages(ordering)
+        rows    = [link for page in pages for link in page]
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(rows, list(Link.objects.order_by(ordering)))
+
+    def test_descending_within_millisecond(self):
+        self.check_ordering('-created_at')
+
+    def test_ascending_within_millisecond(self):
+        self.check_ordering('created_at')
+
+    def test_previous_pages(self):
+        paginator   = KeysetPaginator(Link.objects.all(), 2, '-created_at')
+        first       = paginator.page()
+        second      = paginator.page(first.next_page_number())
+        previous    = paginator.page(second.previous_page_number())
+
+        self.assertEqual(list(previous), list(first))
+
+    def test_relation_ordering_is_rejected(self):
+        self.assertRaises(ValueError, KeysetPaginator, Link.objects.all(), 2, 'tags')
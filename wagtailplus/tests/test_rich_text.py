@@ -0,0 +1,52 @@
+"""
+Contains rich-text whitelister tests.
+"""
+import glob
+import io
+import os
+
+from django.test import SimpleTestCase
+
+from wagtail.wagtailcore.rich_text import DbWhitelister
+from wagtailplus.rich_text import FlexibleDbWhitelister
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'rich_text_corpus')
+
+class ReferenceWhitelister(DbWhitelister):
+    """
+    Stock DbWhitelister that keeps 'DIV' tags, as FlexibleDbWhitelister
+    does.
+    """
+    @classmethod
+    def clean_tag_node(cls, doc, tag):
+        """
+        Cleans specified tag node.
+
+        :param doc: the document instance.
+        :param tag: the tag instance.
+        """
+        if tag.name == 'div' and 'data-embedtype' not in tag.attrs:
+            # Skip DbWhitelister's replacement with a 'P' tag.
+            super(DbWhitelister, cls).clean_tag_node(doc, tag)
+        else:
+            super(ReferenceWhitelister, cls).clean_tag_node(doc, tag)
+
+class FlexibleDbWhitelisterTestCase(SimpleTestCase):
+    """
+    Checks that FlexibleDbWhitelister cleans the corpus documents exactly
+    as the stock whitelister does.
+    """
+    def test_corpus_parity(self):
+        paths = sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html')))
+        self.assertTrue(paths)
+
+        for path in paths:
+            with io.open(path, encoding='utf-8') as f:
+                html = f.read()
+
+            self.assertEqual(
+                FlexibleDbWhitelister.clean(html),
+                ReferenceWhitelister.clean(html),
+                os.path.basename(path)
+            )
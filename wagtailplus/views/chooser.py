@@ -12,7 +12,9 @@ from django.views.generic import UpdateView as _UpdateView
 
 from wagtail.wagtailadmin.forms import SearchForm
 from wagtail.wagtailadmin.modal_workflow import render_modal_workflow
-from wagtail.wagtailsearch.backends import get_search_backends
+from wagtailplus.counters import ModelCountPaginator
+from wagtailplus.pagination import KeysetPaginationMixin
+from wagtailplus.search_index import add_to_index
 
 
 def get_model_permission(permission, model):
@@ -29,11 +31,15 @@ def get_model_permission(permission, model):
         model._meta.verbose_name_raw.lower()
     )
 
-class ChooseView(ListView):
+class ChooseView(KeysetPaginationMixin, ListView):
     """
     Generic view class for listing existing instances.
+
+    Set "keyset_pagination" to page by key instead of offset; search
+    results are still paginated by offset.
     """
     paginate_by         = 10
+    paginator_class     = ModelCountPaginator
     form_class          = None
     chooser_template    = None
     results_template    = None
@@ -75,7 +81,14 @@ class ChooseView(ListView):
         # Paginate the results.
         page_size   = self.get_paginate_by(queryset)
         page        = None
-        if page_size:
+        if page_size and self.keyset_pagination and not is_searching:
+            # Get results paginated by key.
+            paginator, page, queryset, is_paginated = self.paginate_queryset_by_key(
+                queryset,
+                page_size,
+                None
+            )
+        elif page_size:
             # Get paginated results.
             paginator, page, queryset, is_paginated = self.paginate_queryset(
                 queryset,
@@ -170,8 +183,7 @@ class CreateView(_CreateView):
         """
         self.object = form.save()
 
-        for backend in get_search_backends():
-            backend.add(self.object)
+        add_to_index([self.object])
 
         instance_json = json.dumps({
             'id':       self.object.id,
@@ -254,8 +266,7 @@ class UpdateView(_UpdateView):
         """
         self.object = form.save()
 
-        for backend in get_search_backends():
-            backend.add(self.object)
+        add_to_index([self.object])
 
         instance_json = json.dumps({
             'id':       self.object.id,
@@ -2,6 +2,7 @@
 Contains generic class-based CRUD views.
 """
 from django.contrib import messages
+from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
 from django.utils.translation import ugettext as _
 from django.views.decorators.vary import vary_on_headers
@@ -10,19 +11,30 @@ from django.views.generic import DeleteView as _DeleteView
 from django.views.generic import FormView
 from django.views.generic import ListView
 from django.views.generic import UpdateView as _UpdateView
+from django.views.generic import View
 
-from wagtail.wagtailadmin.edit_handlers import BaseObjectList
-from wagtail.wagtailadmin.edit_handlers import extract_panel_definitions_from_model_class
 from wagtail.wagtailadmin.forms import SearchForm
-from wagtail.wagtailsearch.backends import get_search_backends
-
-
-class IndexView(ListView):
+from wagtailplus.app_settings import POPULAR_TAGS_MATERIALIZED
+from wagtailplus.bulk import bulk_add_tag
+from wagtailplus.bulk import bulk_delete
+from wagtailplus.bulk import bulk_remove_tag
+from wagtailplus.counters import ModelCountPaginator
+from wagtailplus.models import TagCount
+from wagtailplus.pagination import KeysetPaginationMixin
+from wagtailplus.registry import get_edit_handler_class
+from wagtailplus.search_index import add_to_index
+
+
+class IndexView(KeysetPaginationMixin, ListView):
     """
     Generic view class for listing existing instances.
+
+    Set "keyset_pagination" to page by key instead of offset; search
+    results are still paginated by offset.
     """
     page_kwarg          = 'p'
     paginate_by         = 20
+    paginator_class     = ModelCountPaginator
     index_template      = None
     results_template    = None
 
@@ -47,7 +59,7 @@ class IndexView(ListView):
         context_object_name = self.get_context_object_name(queryset)
 
         # Determine the desired ordering.
-        ordering    = self.request.GET.get('ordering', '')
+        ordering    = self.request.GET.get('ordering', '') or self.get_cursor_ordering()
         fields      = [f.name for f in self.model._meta.fields]
         if not ordering.replace('-', '') in fields and hasattr(self.model, 'created_at'):
             ordering = '-created_at'
@@ -71,7 +83,14 @@ class IndexView(ListView):
         # Paginate the results.
         page_size   = self.get_paginate_by(queryset)
         page        = None
-        if page_size:
+        if page_size and self.keyset_pagination and not is_searching:
+            # Get results paginated by key.
+            paginator, page, queryset, is_paginated = self.paginate_queryset_by_key(
+                queryset,
+                page_size,
+                ordering
+            )
+        elif page_size:
             # Get paginated results.
             paginator, page, queryset, is_paginated = self.paginate_queryset(
                 queryset,
@@ -91,7 +110,7 @@ class IndexView(ListView):
         if not self.request.is_ajax():
             kwargs.update({
                 'search_form':  form,
-                'popular_tags': self.model.popular_tags(),
+                'popular_tags': self.get_popular_tags(),
             })
 
         if context_object_name is not None:
@@ -99,6 +118,17 @@ class IndexView(ListView):
 
         return kwargs
 
+    def get_popular_tags(self):
+        """
+        Returns list of the most used tags for view model.
+
+        :rtype: list.
+        """
+        if POPULAR_TAGS_MATERIALIZED:
+            return TagCount.objects.get_popular_tags(self.model)
+
+        return self.model.popular_tags()
+
     def get_template_names(self):
         """
         Returns list of template names.
@@ -145,8 +175,7 @@ class BaseFormView(FormView):
         self.object = form.save()
 
         # Reindex the instance to make sure all tags are indexed.
-        for backend in get_search_backends():
-            backend.add(self.object)
+        add_to_index([self.object])
 
         # Add success message.
         messages.success(
@@ -178,34 +207,18 @@ class BaseFormView(FormView):
 
     def get_edit_handler_class(self):
         """
-        Returns edit handler class for view model.
+        Returns edit handler class for view model, built once per model
+        (see wagtailplus.registry).
 
         :rtype: class.
         """
-        # Custom class that skips adding missing fields, as we may want to
-        # limit the number of fields presented to the user.
-        class BaseChooserObjectList(BaseObjectList):
-            def render_missing_fields(self):
-                return ''
-    
-        def ChooserObjectList(children):
-            return type('_ChooserObjectList', (BaseChooserObjectList,), {
-                'children': children,
-            })
-    
-        if hasattr(self.model, 'get_edit_handler'):
-            handler_class = self.model.get_edit_handler()
-        else:
-            handler_class = ChooserObjectList(
-                extract_panel_definitions_from_model_class(self.model)
-            )
-
-        # Return the edit handler class.
-        return handler_class
+        return get_edit_handler_class(self.model)
 
     def get_form_class(self):
         """
-        Returns form class for view model.
+        Returns form class for view model, from its edit handler class.
+        Edit handlers cache their form class, so it is built once per
+        memoized handler class.
 
         :rtype: class.
         """
@@ -255,3 +268,110 @@ class DeleteView(_DeleteView):
 
         # Return the response.
         return redirect(success_url)
+
+class BulkActionView(View):
+    """
+    Generic view class for deleting, tagging or untagging the selected
+    instances, or all instances matching a search query, at once.
+    """
+    http_method_names   = ['post']
+    actions             = ('delete', 'add_tag', 'remove_tag')
+    model               = None
+    success_url         = None
+    delete_permission   = None
+
+    def get_object_ids(self):
+        """
+        Returns list of primary keys of the instances to act on.
+
+        :rtype: list.
+        """
+        data        = self.request.POST
+        queryset    = self.model._default_manager.all()
+
+        if not data.get('select_all'):
+            ids = [pk for pk in data.getlist('id') if pk.isdigit()]
+            return list(queryset.filter(pk__in=ids).values_list('pk', flat=True))
+
+        query_string = data.get('q', '').strip()
+        if query_string:
+            # Fetch every match rather than the backend's default page.
+            results = self.model.search(query_string)
+            return [obj.pk for obj in results[:results.count()]]
+
+        return list(queryset.values_list('pk', flat=True))
+
+    def post(self, request, *args, **kwargs):
+        """
+        Processes POST request.
+
+        :param request: the request instance.
+        :rtype: django.http.HttpResponse.
+        """
+        action  = request.POST.get('bulk_action', '')
+        name    = request.POST.get('tag', '').strip()
+
+        if action not in self.actions:
+            messages.error(request, _(u'Please choose an action.'))
+        elif action != 'delete' and not name:
+            messages.error(request, _(u'Please enter a tag.'))
+        elif action == 'delete' and self.delete_permission and not request.user.has_perm(self.delete_permission):
+            raise PermissionDenied
+        else:
+            getattr(self, action)(self.get_object_ids(), name)
+
+        # Redirect to success URL.
+        return redirect(self.success_url)
+
+    def delete(self, pks, name):
+        """
+        Deletes specified instances.
+
+        :param pks: list of primary keys.
+        :param name: the tag name (unused).
+        """
+        count = bulk_delete(self.model, pks)
+
+        messages.success(
+            self.request,
+            _(u'{0} {1} deleted.').format(
+                count,
+                unicode(self.model._meta.verbose_name_plural)
+            )
+        )
+
+    def add_tag(self, pks, name):
+        """
+        Adds tag with specified name to specified instances.
+
+        :param pks: list of primary keys.
+        :param name: the tag name.
+        """
+        count = bulk_add_tag(self.model, pks, name)
+
+        messages.success(
+            self.request,
+            _(u"Tag '{0}' added to {1} {2}.").format(
+                name,
+                count,
+                unicode(self.model._meta.verbose_name_plural)
+            )
+        )
+
+    def remove_tag(self, pks, name):
+        """
+        Removes tag with specified name from specified instances.
+
+        :param pks: list of primary keys.
+        :param name: the tag name.
+        """
+        count = bulk_remove_tag(self.model, pks, name)
+
+        messages.success(
+            self.request,
+            _(u"Tag '{0}' removed from {1} {2}.").format(
+                name,
+                count,
+                unicode(self.model._meta.verbose_name_plural)
+            )
+        )
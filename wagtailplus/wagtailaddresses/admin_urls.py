@@ -30,6 +30,11 @@ urlpatterns = [
         permission_required('wagtailaddresses.delete_address')(addresses.DeleteView.as_view()),
         name='wagtailaddresses_delete_address'
     ),
+    url(
+        r'^bulk/$',
+        permission_required('wagtailaddresses.change_address')(addresses.BulkActionView.as_view()),
+        name='wagtailaddresses_bulk_action'
+    ),
     # Address chooser URLs.
     url(
         r'^chooser/$',
@@ -30,6 +30,14 @@ class UpdateView(crud.UpdateView):
     template_name   = 'wagtailaddresses/addresses/edit.html'
     success_url     = 'wagtailaddresses_index'
 
+class BulkActionView(crud.BulkActionView):
+    """
+    Address bulk action view.
+    """
+    model               = Address
+    success_url         = 'wagtailaddresses_index'
+    delete_permission   = 'wagtailaddresses.delete_address'
+
 class DeleteView(crud.DeleteView):
     """
     Address delete view.
@@ -48,6 +48,15 @@ urlpatterns = [
         )),
         name='wagtailcontacts_delete_contact'
     ),
+    url(
+        r'^bulk/$',
+        permission_required('wagtailcontacts.change_contact')(crud.BulkActionView.as_view(
+            model=Contact,
+            success_url='wagtailcontacts_index',
+            delete_permission='wagtailcontacts.delete_contact'
+        )),
+        name='wagtailcontacts_bulk_action'
+    ),
     # Contact chooser URLs.
     url(
         r'^chooser/$',
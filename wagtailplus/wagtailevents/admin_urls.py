@@ -47,6 +47,15 @@ urlpatterns = [
         )),
         name='wagtailevents_delete_event'
     ),
+    url(
+        r'^bulk/$',
+        permission_required('wagtailadmin.change_event')(crud.BulkActionView.as_view(
+            model=BaseEvent,
+            success_url='wagtailevents_index',
+            delete_permission='wagtailadmin.delete_event'
+        )),
+        name='wagtailevents_bulk_action'
+    ),
     # Event chooser URLs.
     url(
         r'^chooser/$',
@@ -47,6 +47,15 @@ urlpatterns = [
         )),
         name='wagtaillinks_delete_link'
     ),
+    url(
+        r'^bulk/$',
+        permission_required('wagtaillinks.change_link')(crud.BulkActionView.as_view(
+            model=Link,
+            success_url='wagtaillinks_index',
+            delete_permission='wagtaillinks.delete_link'
+        )),
+        name='wagtaillinks_bulk_action'
+    ),
     # Link chooser URLs.
     url(
         r'^chooser/$',
@@ -4,7 +4,7 @@ Contains address chooser view functions.
 import json
 
 from wagtail.wagtailadmin.modal_workflow import render_modal_workflow
-from wagtail.wagtailsearch.backends import get_search_backends
+from wagtailplus.search_index import add_to_index
 from wagtailplus.views import chooser
 
 from ..forms import ExternalLinkForm
@@ -135,8 +135,7 @@ class CreateAndEmbedLinkView(chooser.CreateView):
         """
         self.object = form.save()
 
-        for backend in get_search_backends():
-            backend.add(self.object)
+        add_to_index([self.object])
 
         if self.object.link_type == Link.LINK_TYPE_EMAIL:
             javascript = 'wagtaillinks/chooser/email-chosen.js'